@@ -1,28 +1,198 @@
-import pandas as pd
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
 import joblib
 
 from agentes.agente import Agente
+from agentes.perezoso import perezoso
 from agentes.agente_especialista import AgenteEspecialista
 from agentes.agente_frontera import AgenteFrontera
 from agentes.agente_random_forest import AgenteRandomForest
+from agentes.predictor_lineal import COLUMNS, PredictorLineal, features
+
+
+class BandasCascada(NamedTuple):
+    """
+    Cuándo la cascada escala un producto a los modelos caros: si el descuento que estima el random forest
+    cae a menos de margin + relative * estimación del umbral de oferta, o si el random forest y la mediana
+    de precios de los productos similares difieren en más de la fracción disagreement
+    """
+
+    margin: float = 30.0
+    relative: float = 0.2
+    disagreement: float = 0.4
+
+    def escalate(self, random_forest: List[float], neighbours: List[float], prices: List[float], threshold: float) -> np.ndarray:
+        random_forest, neighbours, prices = (np.asarray(values, dtype=np.float64) for values in (random_forest, neighbours, prices))
+        near = np.abs(random_forest - prices - threshold) <= self.margin + self.relative * random_forest
+        disagree = np.abs(random_forest - neighbours) > self.disagreement * np.maximum(np.maximum(random_forest, neighbours), 1)
+        return near | disagree
 
 
 class AgenteEnsamblador(Agente):
 
     name = "Agente Ensamblador"
     color = Agente.YELLOW
-    
+
+    # Máximo de llamadas remotas simultáneas por modelo; el frontier aplica el suyo también en price_batch
+    MAX_CONCURRENT_SPECIALIST = int(os.getenv("SPECIALIST_MAX_CONCURRENT", "20"))
+    MAX_CONCURRENT_FRONTIER = AgenteFrontera.MAX_CONCURRENT_CALLS
+
+    # Ejecuta los modelos en paralelo en un pool de hilos, con un tiempo máximo por modelo. Las llamadas
+    # remotas llevan además su propio tiempo máximo, así que un modelo abandonado libera su hilo poco después
+    PARALLEL = True
+    MEMBER_TIMEOUTS = {"specialist": 60.0, "frontier": 30.0, "random_forest": 30.0}
+    # Presupuesto de tiempo de una ejecución del planeador: ningún modelo espera más que esto por un lote
+    TIME_BUDGET = float(os.getenv("PRICING_TIME_BUDGET", "90"))
+
+    # Modo cascada: primero el random forest local y solo los productos dudosos pasan a especialista y frontier
+    CASCADE = os.getenv("ENSEMBLE_CASCADE", "0") == "1"
+    CASCADE_BANDS = BandasCascada(
+        float(os.getenv("CASCADE_MARGIN", "30")),
+        float(os.getenv("CASCADE_RELATIVE", "0.2")),
+        float(os.getenv("CASCADE_DISAGREEMENT", "0.4")),
+    )
+
     def __init__(self, collection):
         """
-        Crea una instancia del ensamblador (ensemble) creando cada uno de los modelos
-        y cargando los pesos del ensemble.
+        Crea una instancia del ensamblador (ensemble). Cada uno de los modelos y los pesos
+        del ensemble se cargan la primera vez que se usan, o antes con warm_up_loaders.
         """
         self.log("Iniciando el Agente Ensamblador")
-        self.specialist = AgenteEspecialista()
-        self.frontier = AgenteFrontera(collection)
-        self.random_forest = AgenteRandomForest()
-        self.model = joblib.load('src/ensemble_model.pkl')
-        self.log("El Agente Ensamblador está listo")
+        self.collection = collection
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ensamblador")
+        self._loop = None
+        self._limits = {}
+        self.log("El Agente Ensamblador está listo - los modelos se cargarán al usarse")
+
+    @perezoso
+    def specialist(self) -> AgenteEspecialista:
+        return AgenteEspecialista()
+
+    @perezoso
+    def frontier(self) -> AgenteFrontera:
+        return AgenteFrontera(self.collection)
+
+    @perezoso
+    def random_forest(self) -> AgenteRandomForest:
+        return AgenteRandomForest()
+
+    @perezoso
+    def model(self):
+        return joblib.load('src/ensemble_model.pkl')
+
+    @perezoso
+    def fast_model(self) -> Optional[PredictorLineal]:
+        fast_model = PredictorLineal.from_model(self.model)
+        if not fast_model:
+            self.log("El modelo del ensemble no es lineal o no coincide con NumPy - se usará sklearn")
+        return fast_model
+
+    def warm_up_loaders(self) -> List:
+        """
+        Devuelve las cargas independientes de este agente, para ejecutarlas en paralelo
+        """
+        return [
+            lambda: self.specialist,
+            lambda: self.frontier,
+            lambda: self.random_forest,
+            lambda: self.fast_model,
+        ]
+
+    def combine(self, specialist: float, frontier: float, random_forest: float) -> float:
+        """
+        Usa el modelo de regresión lineal para combinar las estimaciones de los tres modelos
+        """
+        return self.combine_batch([specialist], [frontier], [random_forest])[0]
+
+    def combine_batch(self, specialist: List[float], frontier: List[float], random_forest: List[float]) -> List[float]:
+        """
+        Combina las estimaciones de varios productos con una sola predicción sobre la matriz completa.
+        Si el modelo es lineal se evalúa con sus coeficientes en NumPy, sin pasar por pandas ni sklearn.
+        """
+        X = features(specialist, frontier, random_forest)
+        if self.fast_model:
+            y = self.fast_model.predict(X)
+        else:
+            import pandas as pd
+            y = self.model.predict(pd.DataFrame(X, columns=COLUMNS))
+        return np.maximum(0, y).tolist()
+
+    def combine_available(self, estimates: Dict[str, Optional[List[Optional[float]]]]) -> List[float]:
+        """
+        Combina las estimaciones disponibles. Si falta la estimación de algún modelo para un producto (por error
+        o timeout), el ensemble se evalúa como sub-modelo sustituyéndola por la media de las restantes.
+        :param estimates: estimaciones de cada modelo para cada producto (None si no hay), o None si el modelo no está disponible
+        :return: la estimación combinada de cada producto
+        """
+        available = [values for values in estimates.values() if values is not None]
+        if not available:
+            raise RuntimeError("Ningún modelo del ensemble ha devuelto una estimación")
+        means = []
+        for row in zip(*available):
+            present = [value for value in row if value is not None]
+            if not present:
+                raise RuntimeError("Ningún modelo del ensemble ha devuelto una estimación")
+            means.append(sum(present) / len(present))
+        missing = [name for name, values in estimates.items() if values is None]
+        missing += [f"{name} (en parte)" for name, values in estimates.items() if values is not None and None in values]
+        if missing:
+            estimates = {
+                name: means if values is None else [mean if value is None else value for value, mean in zip(values, means)]
+                for name, values in estimates.items()
+            }
+            self.log(f"El Agente Ensamblador continúa sin {', '.join(missing)} - usando los modelos restantes")
+        return self.combine_batch(estimates["specialist"], estimates["frontier"], estimates["random_forest"])
+
+    def members(self) -> Dict[str, Agente]:
+        return {"specialist": self.specialist, "frontier": self.frontier, "random_forest": self.random_forest}
+
+    def price_parallel(self, description: str) -> float:
+        """
+        Lanza los tres modelos a la vez en el pool de hilos y espera a cada uno como mucho
+        su tiempo de MEMBER_TIMEOUTS; un modelo lento o que falla no bloquea la estimación.
+        :param description: la descripción de un producto
+        :return: una estimación de su precio
+        """
+        calls = {name: (lambda agent=agent: [agent.price(description)]) for name, agent in self.members().items()}
+        return self.fan_out(calls, self.MEMBER_TIMEOUTS)[0]
+
+    def batch_timeouts(self, count: int) -> Dict[str, float]:
+        """
+        Tiempo máximo de cada modelo para un lote de count productos. El random forest estima el lote de una vez
+        y le basta el mismo límite que para un producto; los modelos remotos hacen como mucho MAX_CONCURRENT_*
+        llamadas simultáneas y necesitan un límite por tanda. Ninguno supera TIME_BUDGET.
+        """
+        timeouts = dict(
+            self.MEMBER_TIMEOUTS,
+            specialist=self.MEMBER_TIMEOUTS["specialist"] * math.ceil(count / self.MAX_CONCURRENT_SPECIALIST),
+            frontier=self.MEMBER_TIMEOUTS["frontier"] * math.ceil(count / self.MAX_CONCURRENT_FRONTIER),
+        )
+        return {name: min(timeout, self.TIME_BUDGET) for name, timeout in timeouts.items()}
+
+    def fan_out(self, calls: Dict[str, Callable[[], List[Optional[float]]]], timeouts: Dict[str, float]) -> List[float]:
+        """
+        Ejecuta la llamada de cada modelo en el pool de hilos, esperando a cada uno
+        como mucho su tiempo de timeouts, y combina los resultados
+        """
+        start = time.monotonic()
+        futures = {name: self.executor.submit(call) for name, call in calls.items()}
+        estimates = {}
+        for name, future in futures.items():
+            remaining = max(0, start + timeouts[name] - time.monotonic())
+            try:
+                estimates[name] = future.result(timeout=remaining)
+            except TimeoutError:
+                self.log(f"El modelo {name} superó su tiempo máximo de {timeouts[name]:.0f}s")
+                estimates[name] = None
+            except Exception as e:
+                self.log(f"El modelo {name} ha fallado: {e}")
+                estimates[name] = None
+        return self.combine_available(estimates)
 
     def price(self, description: str) -> float:
         """
@@ -33,16 +203,177 @@ class AgenteEnsamblador(Agente):
         :return: una estimación de su precio
         """
         self.log("Ejecutando el Agente Ensamblador - colaborando con especialista, frontier y random forest")
-        specialist = self.specialist.price(description)
-        frontier = self.frontier.price(description)
-        random_forest = self.random_forest.price(description)
-        X = pd.DataFrame({
-            'Specialist': [specialist],
-            'Frontier': [frontier],
-            'RandomForest': [random_forest],
-            'Min': [min(specialist, frontier, random_forest)],
-            'Max': [max(specialist, frontier, random_forest)],
-        })
-        y = max(0, self.model.predict(X)[0])
+        if self.PARALLEL:
+            y = self.price_parallel(description)
+        else:
+            specialist = self.specialist.price(description)
+            frontier = self.frontier.price(description)
+            random_forest = self.random_forest.price(description)
+            y = self.combine(specialist, frontier, random_forest)
         self.log(f"El Agente Ensamblador ha completado - devolviendo ${y:.2f}")
-        return y
\ No newline at end of file
+        return y
+
+    def _limit(self, name: str, size: int) -> asyncio.Semaphore:
+        """
+        Devuelve el semáforo del modelo indicado para el event loop actual
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._limits = {}
+        if name not in self._limits:
+            self._limits[name] = asyncio.Semaphore(size)
+        return self._limits[name]
+
+    def price_batch(self, descriptions: List[str]) -> List[float]:
+        """
+        Estima varios productos a la vez: cada modelo recibe el lote completo
+        y el ensemble predice sobre una sola matriz.
+        :param descriptions: las descripciones de los productos
+        :return: una estimación de precio por producto, en el mismo orden
+        """
+        if not descriptions:
+            return []
+        self.log(f"Ejecutando el Agente Ensamblador en lote para {len(descriptions)} productos")
+        timeouts = self.batch_timeouts(len(descriptions))
+        calls = {
+            "specialist": lambda: self.specialist.price_batch(descriptions, timeouts["specialist"]),
+            "frontier": lambda: self.frontier.price_batch(descriptions, timeouts["frontier"]),
+            "random_forest": lambda: self.random_forest.price_batch(descriptions),
+        }
+        if self.PARALLEL:
+            results = self.fan_out(calls, timeouts)
+        else:
+            results = self.combine_available({name: call() for name, call in calls.items()})
+        self.log(f"El Agente Ensamblador ha completado {len(results)} estimaciones en lote")
+        return results
+
+    async def each_limited(self, name: str, calls: List[Callable], deadline: float) -> List[Optional[float]]:
+        """
+        Espera las llamadas de un modelo remoto, con como mucho MAX_CONCURRENT_* en curso a la vez;
+        las que fallan o no terminan antes de deadline quedan como None
+        """
+        limit = self._limit(name, self.MAX_CONCURRENT_SPECIALIST if name == "specialist" else self.MAX_CONCURRENT_FRONTIER)
+        late = 0
+
+        async def one(call):
+            nonlocal late
+            async with limit:
+                try:
+                    return await asyncio.wait_for(call(), max(0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    late += 1
+                except Exception as e:
+                    self.log(f"El modelo {name} no ha podido estimar un producto: {e!r}")
+                return None
+
+        results = await asyncio.gather(*[one(call) for call in calls])
+        if late:
+            self.log(f"El modelo {name} superó su tiempo máximo en {late} de {len(calls)} productos")
+        return list(results)
+
+    async def price_batch_async(self, descriptions: List[str]) -> List[float]:
+        """
+        Versión asíncrona de price_batch: los tres modelos estiman el lote a la vez, y cada producto es una
+        llamada remota separada, con un límite de llamadas simultáneas para cada modelo remoto y los mismos
+        tiempos máximos por lote y degradación por producto que price_batch.
+        :param descriptions: las descripciones de los productos
+        :return: una estimación de precio por producto, en el mismo orden
+        """
+        if not descriptions:
+            return []
+        self.log(f"Ejecutando el Agente Ensamblador en lote asíncrono para {len(descriptions)} productos")
+        timeouts = self.batch_timeouts(len(descriptions))
+        start = time.monotonic()
+
+        async def specialist():
+            agent = await asyncio.to_thread(lambda: self.specialist)
+            calls = [lambda description=description: agent.price_async(description) for description in descriptions]
+            return await self.each_limited("specialist", calls, start + timeouts["specialist"])
+
+        async def frontier():
+            agent = await asyncio.to_thread(lambda: self.frontier)
+            similars = await asyncio.wait_for(
+                asyncio.to_thread(agent.find_similars_batch, descriptions), start + timeouts["frontier"] - time.monotonic()
+            )
+            calls = [
+                lambda description=description, similar=similar: agent.complete_async(description, *similar)
+                for description, similar in zip(descriptions, similars)
+            ]
+            return await self.each_limited("frontier", calls, start + timeouts["frontier"])
+
+        async def random_forest():
+            return await asyncio.wait_for(
+                asyncio.to_thread(lambda: self.random_forest.price_batch(descriptions)), timeouts["random_forest"]
+            )
+
+        async def member(name, coroutine):
+            try:
+                return await coroutine
+            except asyncio.TimeoutError:
+                self.log(f"El modelo {name} superó su tiempo máximo de {timeouts[name]:.0f}s")
+            except Exception as e:
+                self.log(f"El modelo {name} ha fallado: {e}")
+            return None
+
+        coroutines = {"specialist": specialist(), "frontier": frontier(), "random_forest": random_forest()}
+        results = await asyncio.gather(*[member(name, coroutine) for name, coroutine in coroutines.items()])
+        results = self.combine_available(dict(zip(coroutines, results)))
+        self.log(f"El Agente Ensamblador ha completado {len(results)} estimaciones en lote")
+        return results
+
+    def cheap_estimates(self, descriptions: List[str]) -> Tuple[List[float], List[float]]:
+        """
+        Estimaciones locales y baratas: el random forest y la mediana de precios de los 5 productos
+        similares que encuentra la búsqueda RAG, sin llamar a ningún LLM
+        """
+        random_forest = self.random_forest.price_batch(descriptions)
+        neighbours = [
+            float(np.median(prices)) if prices else estimate
+            for (_, prices), estimate in zip(self.frontier.find_similars_batch(descriptions), random_forest)
+        ]
+        return random_forest, neighbours
+
+    def escalation(self, descriptions: List[str], prices: List[float], threshold: float,
+                   bands: Optional[BandasCascada] = None) -> Tuple[List[float], List[bool]]:
+        """
+        Primer paso de la cascada: la estimación del random forest de cada producto y si las bandas lo marcan como dudoso
+        """
+        bands = bands or self.CASCADE_BANDS
+        random_forest, neighbours = self.cheap_estimates(descriptions)
+        escalate = bands.escalate(random_forest, neighbours, prices, threshold).tolist()
+        self.log(f"Cascada: {sum(escalate)} de {len(descriptions)} productos pasan a especialista y frontier")
+        return random_forest, escalate
+
+    def cascade(self, descriptions: List[str], prices: List[float], threshold: float,
+                bands: Optional[BandasCascada] = None) -> Tuple[List[float], List[bool]]:
+        """
+        Estima en cascada: se queda con la estimación del random forest salvo para los productos que
+        las bandas marcan como dudosos, que se estiman con el ensemble completo
+        :param prices: el precio de oferta de cada producto
+        :param threshold: el descuento a partir del cual una oferta genera alerta
+        :return: una estimación de precio por producto, en el mismo orden, y si cada una viene del ensemble completo
+        """
+        if not descriptions:
+            return [], []
+        random_forest, escalate = self.escalation(descriptions, prices, threshold, bands)
+        full = iter(self.price_batch([description for description, escalated in zip(descriptions, escalate) if escalated]))
+        return [next(full) if escalated else estimate for estimate, escalated in zip(random_forest, escalate)], escalate
+
+    async def cascade_async(self, descriptions: List[str], prices: List[float], threshold: float,
+                            bands: Optional[BandasCascada] = None) -> Tuple[List[float], List[bool]]:
+        """
+        Versión asíncrona de cascade, que estima los productos dudosos con price_batch_async
+        """
+        if not descriptions:
+            return [], []
+        random_forest, escalate = await asyncio.to_thread(self.escalation, descriptions, prices, threshold, bands)
+        full = iter(await self.price_batch_async([description for description, escalated in zip(descriptions, escalate) if escalated]))
+        return [next(full) if escalated else estimate for estimate, escalated in zip(random_forest, escalate)], escalate
+
+    def price_cascade(self, descriptions: List[str], prices: List[float], threshold: float,
+                      bands: Optional[BandasCascada] = None) -> List[float]:
+        """
+        Como cascade, devolviendo solo las estimaciones
+        """
+        return self.cascade(descriptions, prices, threshold, bands)[0]
@@ -1,5 +1,8 @@
-import modal
+import os
+import time
+from typing import List, Optional
 from agentes.agente import Agente
+from agentes.cache_respuestas import get_cache
 
 
 class AgenteEspecialista(Agente):
@@ -10,20 +13,92 @@ class AgenteEspecialista(Agente):
     name = "Agente Especialista"
     color = Agente.RED
 
+    MODEL = "pricer-service/Pricer"
+    # Tiempo máximo de una llamada remota; pasado ese tiempo se cancela en Modal en lugar de dejarla colgada
+    TIMEOUT = float(os.getenv("SPECIALIST_TIMEOUT", "50"))
+
     def __init__(self):
         """
         Configura este agente creando una instancia de la clase de Modal.
         """
         self.log("El Agente Especialista se está inicializando: conectando a Modal")
+        import modal
         Pricer = modal.Cls.from_name("pricer-service", "Pricer")
         self.pricer = Pricer()
+        self.cache = get_cache()
         self.log("El Agente Especialista está listo")
-        
+
+    def remote(self, description: str, timeout: float) -> float:
+        """
+        Lanza la llamada a Modal y espera su resultado como mucho timeout segundos; si no llega, o falla, la cancela
+        """
+        call = self.pricer.price.spawn(description)
+        try:
+            return call.get(timeout=timeout)
+        except Exception:
+            call.cancel()
+            raise
+
     def price(self, description: str) -> float:
         """
-        Realiza una llamada remota para devolver la estimación del precio de este artículo.
+        Realiza una llamada remota para devolver la estimación del precio de este artículo,
+        salvo que la misma descripción ya esté en la caché de respuestas.
         """
+        key = self.cache.key(self.MODEL, description)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.log(f"El Agente Especialista ha usado la caché - predicción: ${cached:.2f}")
+            return cached
         self.log("El Agente Especialista está llamando al modelo afinado remoto")
-        result = self.pricer.price.remote(description)
+        result = self.remote(description, self.TIMEOUT)
+        self.cache.put(key, self.MODEL, result)
         self.log(f"El Agente Especialista ha terminado - predicción: ${result:.2f}")
-        return result
\ No newline at end of file
+        return result
+
+    async def price_async(self, description: str) -> float:
+        """
+        Versión asíncrona de price: espera la llamada remota a Modal sin bloquear el event loop,
+        y la cancela si no termina a tiempo o si se cancela la espera.
+        """
+        key = self.cache.key(self.MODEL, description)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.log(f"El Agente Especialista ha usado la caché - predicción: ${cached:.2f}")
+            return cached
+        self.log("El Agente Especialista está llamando al modelo afinado remoto")
+        call = await self.pricer.price.spawn.aio(description)
+        try:
+            result = await call.get.aio(timeout=self.TIMEOUT)
+        except BaseException:
+            await call.cancel.aio()
+            raise
+        self.cache.put(key, self.MODEL, result)
+        self.log(f"El Agente Especialista ha terminado - predicción: ${result:.2f}")
+        return result
+
+    def price_batch(self, descriptions: List[str], timeout: Optional[float] = None) -> List[Optional[float]]:
+        """
+        Estima varios artículos lanzando a la vez las llamadas remotas, que Modal reparte entre sus contenedores;
+        solo se envían las descripciones que no están en la caché de respuestas
+        :param timeout: tiempo máximo para todo el lote; las llamadas que no terminan a tiempo se cancelan
+        :return: los precios, en el mismo orden, con None en los artículos cuya llamada falló o no terminó a tiempo
+        """
+        keys = [self.cache.key(self.MODEL, description) for description in descriptions]
+        results = [self.cache.get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        failed = 0
+        if pending:
+            self.log(f"El Agente Especialista está llamando al modelo afinado remoto con {len(pending)} productos")
+            deadline = time.monotonic() + (self.TIMEOUT if timeout is None else timeout)
+            calls = {i: self.pricer.price.spawn(descriptions[i]) for i in pending}
+            for i, call in calls.items():
+                try:
+                    results[i] = call.get(timeout=max(0, deadline - time.monotonic()))
+                except Exception as e:
+                    call.cancel()
+                    failed += 1
+                    self.log(f"El Agente Especialista no ha podido estimar un producto: {e!r}")
+                    continue
+                self.cache.put(keys[i], self.MODEL, results[i])
+        self.log(f"El Agente Especialista ha terminado las predicciones en lote ({len(descriptions) - len(pending)} desde la caché, {failed} fallidas)")
+        return results
@@ -1,9 +1,13 @@
+import asyncio
 import os
 import re
-from typing import List, Dict
-from sentence_transformers import SentenceTransformer
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from agentes.agente import Agente
-from groq import Groq
+from agentes.embeddings import ServicioEmbeddings
+from agentes.cache_respuestas import get_cache
+from agentes.indice_vectores import IndiceVectores
 
 
 class AgenteFrontera(Agente):
@@ -12,33 +16,47 @@ class AgenteFrontera(Agente):
     color = Agente.BLUE
 
     MODEL = "llama-3.3-70b-versatile"
+    MAX_CONCURRENT_CALLS = int(os.getenv("FRONTIER_MAX_CONCURRENT", "4"))
+    # Tiempo máximo de cada llamada al LLM, con un solo reintento, para que una llamada colgada no retenga su hilo
+    TIMEOUT = float(os.getenv("FRONTIER_TIMEOUT", "12"))
+    MAX_RETRIES = 1
+    # Carpeta del índice vectorial en proceso; si no se define, las búsquedas RAG consultan a Chroma
+    LOCAL_INDEX_PATH = os.getenv("LOCAL_VECTOR_INDEX")
 
     def __init__(self, collection):
         """
         Configura esta instancia conectando a Groq u OpenAI,
-        configurando el datastore Chroma y el modelo de embeddings.
+        configurando el datastore Chroma y el servicio de embeddings compartido.
         """
         self.log("Inicializando el Agente Frontera")
 
         # 1️⃣ Usa Groq si hay clave configurada
         if os.getenv("GROQ_API_KEY"):
-            self.client = Groq()
+            from groq import Groq, AsyncGroq
+            self.client = Groq(timeout=self.TIMEOUT, max_retries=self.MAX_RETRIES)
+            self.async_client_class = AsyncGroq
             self.MODEL = "llama-3.3-70b-versatile"  # o "llama-3.3-70b-versatile"
             self.log("El Agente Frontera está configurado con Groq")
 
         # 2️⃣ De lo contrario, usa OpenAI como respaldo
         else:
-            from openai import OpenAI
-            self.client = OpenAI()
+            from openai import OpenAI, AsyncOpenAI
+            self.client = OpenAI(timeout=self.TIMEOUT, max_retries=self.MAX_RETRIES)
+            self.async_client_class = AsyncOpenAI
             self.MODEL = "gpt-4o-mini"
             self.log("El Agente Frontera está configurado con OpenAI")
 
+        self.cache = get_cache()
+        self._loop = None
+        self._async_client = None
+
         # Configura la colección vectorial y el modelo de embeddings
         self.collection = collection
-        try:
-            self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', device='cpu')
-        except RuntimeError:
-            self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2').to('cpu')
+        self.model = ServicioEmbeddings.get()
+        self.index = None
+        if self.LOCAL_INDEX_PATH:
+            self.index = IndiceVectores(collection, self.LOCAL_INDEX_PATH)
+            self.log(f"El Agente Frontera ha cargado el índice vectorial local con {len(self.index)} productos")
         self.log("El Agente Frontera está listo")
 
     def make_context(self, similars: List[str], prices: List[float]) -> str:
@@ -60,12 +78,34 @@ class AgenteFrontera(Agente):
     def find_similars(self, description: str):
         self.log("El Agente Frontera realiza una búsqueda RAG en el datastore de Chroma para encontrar 5 productos similares")
         vector = self.model.encode([description])
-        results = self.collection.query(query_embeddings=vector.astype(float).tolist(), n_results=5)
-        documents = results['documents'][0][:]
-        prices = [m['price'] for m in results['metadatas'][0][:]]
+        if self.index:
+            self.index.refresh()
+            documents, prices = self.index.search(vector, k=5)[0]
+        else:
+            results = self.collection.query(query_embeddings=vector.astype(float).tolist(), n_results=5)
+            documents = results['documents'][0][:]
+            prices = [m['price'] for m in results['metadatas'][0][:]]
         self.log("El Agente Frontera ha encontrado productos similares")
         return documents, prices
 
+    def find_similars_batch(self, descriptions: List[str]) -> List[Tuple[List[str], List[float]]]:
+        """
+        Busca los 5 productos similares de varias descripciones con una sola codificación y una sola consulta a Chroma
+        """
+        self.log(f"El Agente Frontera realiza una búsqueda RAG en lote para {len(descriptions)} productos")
+        vectors = self.model.encode(descriptions)
+        if self.index:
+            self.index.refresh()
+            similars = self.index.search(vectors, k=5)
+        else:
+            results = self.collection.query(query_embeddings=vectors.astype(float).tolist(), n_results=5)
+            similars = [
+                (documents, [m['price'] for m in metadatas])
+                for documents, metadatas in zip(results['documents'], results['metadatas'])
+            ]
+        self.log("El Agente Frontera ha encontrado productos similares")
+        return similars
+
     def get_price(self, s) -> float:
         s = s.replace('$', '').replace(',', '')
         match = re.search(r"[-+]?\d*\.\d+|\d+", s)
@@ -77,16 +117,88 @@ class AgenteFrontera(Agente):
         basándose en productos similares del datastore de Chroma.
         """
         documents, prices = self.find_similars(description)
+        return self.complete(description, documents, prices)
+
+    def complete(self, description: str, documents: List[str], prices: List[float]) -> float:
+        """
+        Llama al LLM con el contexto de productos similares y devuelve el precio de su respuesta.
+        Si el mismo prompt (descripción y contexto RAG) ya se respondió, se usa la caché.
+        """
+        messages = self.messages_for(description, documents, prices)
+        key = self.cache.key(self.MODEL, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.log(f"El Agente Frontera ha usado la caché - predicción: ${cached:.2f}")
+            return cached
         self.log(f"El Agente Frontera está a punto de llamar a {self.MODEL} con contexto que incluye 5 productos similares")
 
         response = self.client.chat.completions.create(
             model=self.MODEL,
-            messages=self.messages_for(description, documents, prices),
+            messages=messages,
+            max_tokens=5,
+            temperature=0.2,
+        )
+
+        reply = response.choices[0].message.content
+        result = self.get_price(reply)
+        self.cache.put(key, self.MODEL, result)
+        self.log(f"El Agente Frontera ha terminado - predicción: ${result:.2f}")
+        return result
+
+    def price_batch(self, descriptions: List[str], timeout: Optional[float] = None) -> List[Optional[float]]:
+        """
+        Estima varios productos: la búsqueda RAG se hace en lote y las llamadas al LLM
+        se lanzan en paralelo, con como mucho MAX_CONCURRENT_CALLS simultáneas.
+        :param timeout: tiempo máximo para todo el lote
+        :return: los precios, en el mismo orden, con None en los productos cuya llamada falló o no terminó a tiempo
+        """
+        similars = self.find_similars_batch(descriptions)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        executor = ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_CALLS)
+        futures = [executor.submit(self.complete, description, *similar) for description, similar in zip(descriptions, similars)]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=None if deadline is None else max(0, deadline - time.monotonic())))
+            except Exception as e:
+                self.log(f"El Agente Frontera no ha podido estimar un producto: {e!r}")
+                results.append(None)
+        # Las llamadas que no han empezado se descartan; las que siguen en curso terminan solas con el TIMEOUT del cliente
+        executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def async_client(self):
+        """
+        Devuelve el cliente asíncrono del event loop actual. Su pool de conexiones queda ligado al loop
+        en que se creó, y cada ejecución del framework abre un loop nuevo con asyncio.run.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._async_client = self.async_client_class(timeout=self.TIMEOUT, max_retries=self.MAX_RETRIES)
+        return self._async_client
+
+    async def complete_async(self, description: str, documents: List[str], prices: List[float]) -> float:
+        """
+        Versión asíncrona de complete, que llama al LLM con el cliente asíncrono de Groq u OpenAI
+        """
+        messages = self.messages_for(description, documents, prices)
+        key = self.cache.key(self.MODEL, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.log(f"El Agente Frontera ha usado la caché - predicción: ${cached:.2f}")
+            return cached
+        self.log(f"El Agente Frontera está a punto de llamar a {self.MODEL} con contexto que incluye 5 productos similares")
+
+        response = await self.async_client().chat.completions.create(
+            model=self.MODEL,
+            messages=messages,
             max_tokens=5,
             temperature=0.2,
         )
 
         reply = response.choices[0].message.content
         result = self.get_price(reply)
+        self.cache.put(key, self.MODEL, result)
         self.log(f"El Agente Frontera ha terminado - predicción: ${result:.2f}")
-        return result
\ No newline at end of file
+        return result
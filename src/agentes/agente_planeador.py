@@ -1,9 +1,16 @@
+import asyncio
+import math
+import os
+import time
 from typing import Optional, List
 from agentes.agente import Agente
 from agentes.deals import Deal, Opportunity
 from agentes.agente_scanner import AgenteScanner
 from agentes.agente_ensamblador import AgenteEnsamblador
 from agentes.agente_mensajero import AgenteMensajero
+from agentes.indice_vistos import IndiceVistos
+from agentes.embeddings import ServicioEmbeddings
+from agentes.perezoso import perezoso, warm_up
 
 
 class AgentePlaneador(Agente):
@@ -11,17 +18,58 @@ class AgentePlaneador(Agente):
     name = "Agente Planeador"
     color = Agente.GREEN
     DEAL_THRESHOLD = 50
+    # Ofertas que se estiman a la vez: las llamadas simultáneas del frontier marcan el ritmo de cada tanda
+    MAX_CONCURRENT_DEALS = AgenteEnsamblador.MAX_CONCURRENT_FRONTIER
+    # Presupuesto de cada ejecución para las estimaciones caras (especialista y frontier)
+    TIME_BUDGET = AgenteEnsamblador.TIME_BUDGET
+    TOKEN_BUDGET = int(os.getenv("PRICING_TOKEN_BUDGET", "20000"))
+    # Estimación inicial de lo que tarda una tanda de MAX_CONCURRENT_DEALS ofertas; se ajusta con lo medido
+    SECONDS_PER_ROUND = 15.0
+    # Suelo de esa estimación: una ejecución rápida (caché, cascada) no debe disparar el tamaño de la siguiente
+    MIN_SECONDS_PER_ROUND = 5.0
+    # Tokens de salida del scanner por oferta pedida (un resumen de 4–5 frases en JSON)
+    SCAN_TOKENS_PER_DEAL = 200
+    # Longitud típica de esos resúmenes, para estimar la llamada frontier antes de tenerlos
+    DESCRIPTION_CHARS = 500
 
-    def __init__(self, collection):
+    def __init__(self, collection, seen: Optional[IndiceVistos] = None):
         """
-        Crea instancias de los 3 Agentes que este planificador coordina
+        Prepara los 3 Agentes que este planificador coordina; cada uno se crea la primera vez
+        que se usa, o antes con warm_up
+        :param seen: índice opcional de URLs ya estimadas, para no volver a estimarlas
         """
         self.log("El Agente Planeador se está inicializando")
-        self.scanner = AgenteScanner()
-        self.ensemble = AgenteEnsamblador(collection)
-        self.messenger = AgenteMensajero()
+        self.collection = collection
+        self.seen = seen
+        self.seconds_per_round = self.SECONDS_PER_ROUND
         self.log("El Agente Planeador está listo")
 
+    @perezoso
+    def scanner(self) -> AgenteScanner:
+        return AgenteScanner()
+
+    @perezoso
+    def ensemble(self) -> AgenteEnsamblador:
+        return AgenteEnsamblador(self.collection)
+
+    @perezoso
+    def messenger(self) -> AgenteMensajero:
+        return AgenteMensajero()
+
+    def warm_up(self) -> None:
+        """
+        Carga en paralelo todas las piezas pesadas e independientes: clientes de OpenAI, Groq,
+        Modal y Pushover, el modelo de embeddings y los modelos locales
+        """
+        self.log("El Agente Planeador está precargando los agentes en paralelo")
+        warm_up([
+            lambda: self.scanner,
+            lambda: self.messenger,
+            lambda: ServicioEmbeddings.get().model,
+            *self.ensemble.warm_up_loaders(),
+        ])
+        self.log("El Agente Planeador ha terminado la precarga")
+
     def run(self, deal: Deal) -> Opportunity:
         """
         Ejecuta el flujo de trabajo para una oferta específica
@@ -34,24 +82,173 @@ class AgentePlaneador(Agente):
         self.log(f"El Agente Planeador ha procesado una oferta con descuento de ${discount:.2f}")
         return Opportunity(deal=deal, estimate=estimate, discount=discount)
 
+    def run_batch(self, deals: List[Deal]) -> List[Opportunity]:
+        """
+        Ejecuta el flujo de trabajo para varias ofertas, estimándolas en lote con el ensemble
+        :param deals: las ofertas, resumidas de un RSS scrape
+        :returns: una oportunidad por oferta, en el mismo orden
+        """
+        self.log(f"El Agente Planeador está calculando el precio de {len(deals)} posibles ofertas")
+        descriptions = [deal.product_description for deal in deals]
+        start = time.monotonic()
+        if self.ensemble.CASCADE:
+            estimates, full = self.ensemble.cascade(descriptions, [deal.price for deal in deals], self.DEAL_THRESHOLD)
+        else:
+            estimates, full = self.ensemble.price_batch(descriptions), [True] * len(deals)
+        return self.opportunities(deals, estimates, full, time.monotonic() - start)
+
+    async def run_batch_async(self, deals: List[Deal]) -> List[Opportunity]:
+        """
+        Versión asíncrona de run_batch: cada modelo remoto estima todas las ofertas a la vez,
+        con los límites de llamadas simultáneas del ensemble
+        :param deals: las ofertas, resumidas de un RSS scrape
+        :returns: una oportunidad por oferta, en el mismo orden
+        """
+        self.log(f"El Agente Planeador está calculando el precio de {len(deals)} posibles ofertas")
+        descriptions = [deal.product_description for deal in deals]
+        start = time.monotonic()
+        if self.ensemble.CASCADE:
+            estimates, full = await self.ensemble.cascade_async(descriptions, [deal.price for deal in deals], self.DEAL_THRESHOLD)
+        else:
+            estimates, full = await self.ensemble.price_batch_async(descriptions), [True] * len(deals)
+        return self.opportunities(deals, estimates, full, time.monotonic() - start)
+
+    def opportunities(self, deals: List[Deal], estimates: List[float], full: List[bool], elapsed: float) -> List[Opportunity]:
+        """
+        Registra las estimaciones y construye una oportunidad por oferta
+        """
+        self.record(deals, estimates, full, elapsed)
+        opportunities = [
+            Opportunity(deal=deal, estimate=estimate, discount=estimate - deal.price)
+            for deal, estimate in zip(deals, estimates)
+        ]
+        self.log(f"El Agente Planeador ha procesado {len(opportunities)} ofertas")
+        return opportunities
+
+    def record(self, deals: List[Deal], estimates: List[float], full: List[bool], elapsed: float) -> None:
+        """
+        Guarda en el índice de vistas la estimación de cada oferta, y cuánto costó por oferta la del ensemble
+        completo, para poder evaluar la cascada sin conexión sobre todas las ofertas estimadas
+        """
+        if self.seen is None:
+            return
+        seconds = elapsed / max(1, sum(full))
+        self.seen.record_estimates(
+            (deal.url, deal.product_description, deal.price, estimate, is_full, seconds if is_full else None)
+            for deal, estimate, is_full in zip(deals, estimates, full)
+        )
+
+    def remember(self, opportunities: List[Opportunity]) -> None:
+        """
+        Registra las URLs de todas las ofertas estimadas en el índice, superen el umbral o no
+        """
+        if self.seen is not None:
+            self.seen.add_many(opp.deal.url for opp in opportunities)
+
+    @staticmethod
+    def frontier_tokens(chars: int) -> int:
+        """
+        Aproxima los tokens de la llamada frontier para una descripción de chars caracteres: la descripción
+        más las 5 similares del contexto, de longitud parecida, a unos 4 caracteres por token
+        """
+        return 150 + chars * 6 // 4
+
+    @staticmethod
+    def tokens_for(deal: Deal) -> int:
+        return AgentePlaneador.frontier_tokens(len(deal.product_description))
+
+    def capacity(self) -> int:
+        """
+        Cuántas ofertas pedir al scanner: las que caben en el presupuesto de tiempo, según lo que han tardado
+        las últimas tandas, y en el de tokens, contando la salida del scanner y la llamada frontier de cada una
+        """
+        rounds = max(1, int(self.TIME_BUDGET // self.seconds_per_round))
+        by_tokens = self.TOKEN_BUDGET // (self.SCAN_TOKENS_PER_DEAL + self.frontier_tokens(self.DESCRIPTION_CHARS))
+        return max(1, min(rounds * self.MAX_CONCURRENT_DEALS, by_tokens))
+
+    def shortlist(self, deals: List[Deal], spent: int = 0) -> List[Deal]:
+        """
+        Ordena las ofertas por el descuento que estima el random forest local, que es barato, y se queda
+        con las mejores que caben en el presupuesto de tiempo y de tokens de la ejecución
+        :param spent: tokens ya consumidos en la ejecución, los de la salida del scanner
+        """
+        try:
+            estimates = self.ensemble.random_forest.price_batch([deal.product_description for deal in deals])
+            ranked = [deal for _, deal in sorted(zip(estimates, deals), key=lambda pair: pair[0] - pair[1].price, reverse=True)]
+        except Exception as e:
+            self.log(f"El random forest ha fallado al ordenar las ofertas, se mantiene el orden del scanner: {e}")
+            ranked = list(deals)
+        chosen, tokens = [], spent
+        for deal in ranked[:self.capacity()]:
+            cost = self.tokens_for(deal)
+            if chosen and tokens + cost > self.TOKEN_BUDGET:
+                break
+            chosen.append(deal)
+            tokens += cost
+        self.log(f"El Agente Planeador estimará {len(chosen)} de {len(deals)} ofertas (~{tokens} tokens, {spent} del scanner)")
+        return chosen
+
+    def measure(self, count: int, elapsed: float) -> None:
+        """
+        Actualiza con una media móvil lo que tarda cada tanda de ofertas, para el presupuesto de la siguiente ejecución
+        """
+        rounds = math.ceil(count / self.MAX_CONCURRENT_DEALS)
+        estimate = 0.5 * self.seconds_per_round + 0.5 * elapsed / rounds
+        self.seconds_per_round = max(self.MIN_SECONDS_PER_ROUND, estimate)
+
+    def choose(self, opportunities: List[Opportunity]) -> Optional[Opportunity]:
+        """
+        Elige la oportunidad con mayor descuento y la devuelve si supera el umbral
+        """
+        opportunities.sort(key=lambda opp: opp.discount, reverse=True)
+        best = opportunities[0]
+        self.log(f"El Agente Planeador ha identificado que la mejor oferta tiene un descuento de ${best.discount:.2f}")
+        return best if best.discount > self.DEAL_THRESHOLD else None
+
+    def conclude(self, deals: List[Deal], opportunities: List[Opportunity], elapsed: float) -> Optional[Opportunity]:
+        """
+        Cierra una ejecución: ajusta el presupuesto, recuerda las ofertas estimadas y alerta de la mejor si supera el umbral
+        """
+        self.measure(len(deals), elapsed)
+        self.remember(opportunities)
+        best = self.choose(opportunities)
+        if best:
+            self.messenger.alert(best)
+        self.log("El Agente Planeador ha completado una ejecución")
+        return best
+
     def plan(self, memory: List[str] = []) -> Optional[Opportunity]:
         """
         Ejecuta el flujo de trabajo completo:
         1. Usa el AgenteScanner para encontrar ofertas de feeds RSS
         2. Usa el AgenteEnsamblador para estimarlas
         3. Usa el AgenteMensajero para enviar notificaciones de ofertas
-        :param memory: una lista de URLs que han sido encontradas en el pasado
+        :param memory: las oportunidades encontradas en el pasado: el almacén de memoria, consultado por URL, o una lista
+        :return: una Oportunidad si se encontró una, si no, None
+        """
+        self.log("El Agente Planeador está iniciando una ejecución")
+        selection = self.scanner.scan(memory=memory, seen=self.seen, count=self.capacity())
+        if selection and selection.deals:
+            deals = self.shortlist(selection.deals, self.scanner.tokens_used)
+            start = time.monotonic()
+            opportunities = self.run_batch(deals)
+            return self.conclude(deals, opportunities, time.monotonic() - start)
+        return None
+
+    async def plan_async(self, memory: List[str] = []) -> Optional[Opportunity]:
+        """
+        Versión asíncrona de plan: el scanner y la preselección corren en hilos sin bloquear el event loop,
+        y las ofertas se estiman con run_batch_async, lanzando todas las llamadas remotas a la vez
+        dentro de los límites de concurrencia de cada modelo.
+        :param memory: las oportunidades encontradas en el pasado: el almacén de memoria, consultado por URL, o una lista
         :return: una Oportunidad si se encontró una, si no, None
         """
         self.log("El Agente Planeador está iniciando una ejecución")
-        selection = self.scanner.scan(memory=memory)
-        if selection:
-            opportunities = [self.run(deal) for deal in selection.deals[:5]]
-            opportunities.sort(key=lambda opp: opp.discount, reverse=True)
-            best = opportunities[0]
-            self.log(f"El Agente Planeador ha identificado que la mejor oferta tiene un descuento de ${best.discount:.2f}")
-            if best.discount > self.DEAL_THRESHOLD:
-                self.messenger.alert(best)
-            self.log("El Agente Planeador ha completado una ejecución")
-            return best if best.discount > self.DEAL_THRESHOLD else None
-        return None
\ No newline at end of file
+        scanner = await asyncio.to_thread(lambda: self.scanner)
+        selection = await asyncio.to_thread(scanner.scan, memory, self.seen, self.capacity())
+        if selection and selection.deals:
+            deals = await asyncio.to_thread(self.shortlist, selection.deals, scanner.tokens_used)
+            start = time.monotonic()
+            opportunities = await self.run_batch_async(deals)
+            return self.conclude(deals, opportunities, time.monotonic() - start)
+        return None
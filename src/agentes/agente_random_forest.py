@@ -1,6 +1,9 @@
-from sentence_transformers import SentenceTransformer
+import os
+from typing import List
 import joblib
 from agentes.agente import Agente
+from agentes.bosque_compacto import BosqueCompacto
+from agentes.embeddings import ServicioEmbeddings
 
 
 
@@ -9,17 +12,22 @@ class AgenteRandomForest(Agente):
     name = "Agente Random Forest"
     color = Agente.MAGENTA
 
+    MODEL_PATH = 'src/random_forest_model.pkl'
+    # Generado con: python src/agentes/bosque_compacto.py
+    COMPACT_MODEL_PATH = 'src/random_forest_compacto'
+
     def __init__(self):
         """
         Inicializa este objeto cargando los pesos del modelo guardado
-        y el modelo de codificación vectorial SentenceTransformer
+        (en formato compacto si está disponible) y el servicio de embeddings compartido
         """
         self.log("El Agente Random Forest se está inicializando")
-        try:
-            self.vectorizer = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', device='cpu')
-        except RuntimeError:
-            self.vectorizer = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2').to('cpu')
-        self.model = joblib.load('src/random_forest_model.pkl')
+        self.vectorizer = ServicioEmbeddings.get()
+        if os.path.exists(self.COMPACT_MODEL_PATH):
+            self.model = BosqueCompacto.load(self.COMPACT_MODEL_PATH)
+            self.log("El Agente Random Forest usa el bosque compacto mapeado en memoria")
+        else:
+            self.model = joblib.load(self.MODEL_PATH)
         self.log("El Agente Random Forest está listo")
 
     def price(self, description: str) -> float:
@@ -32,4 +40,16 @@ class AgenteRandomForest(Agente):
         vector = self.vectorizer.encode([description])
         result = max(0, self.model.predict(vector)[0])
         self.log(f"El Agente Random Forest ha completado - prediciendo ${result:.2f}")
-        return result
\ No newline at end of file
+        return result
+
+    def price_batch(self, descriptions: List[str]) -> List[float]:
+        """
+        Estima varios artículos a la vez: una sola codificación y una sola predicción sobre la matriz completa
+        :param descriptions: los productos a ser estimados
+        :return: los precios, en el mismo orden
+        """
+        self.log(f"El Agente Random Forest está iniciando {len(descriptions)} predicciones en lote")
+        vectors = self.vectorizer.encode(descriptions)
+        results = [max(0, float(y)) for y in self.model.predict(vectors)]
+        self.log("El Agente Random Forest ha completado las predicciones en lote")
+        return results
\ No newline at end of file
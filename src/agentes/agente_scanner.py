@@ -1,16 +1,36 @@
-from typing import Optional, List
-from openai import OpenAI
-from agentes.deals import ScrapedDeal, DealSelection
+import os
+from typing import Container, Optional, List, Union
+from agentes.deals import ScrapedDeal, DealSelection, Opportunity
 from agentes.agente import Agente
+from agentes.indice_vistos import IndiceVistos
+
+
+class UrlsConocidas:
+    """
+    URLs que el scanner debe descartar: las de la memoria y, si hay índice, todas las ya estimadas.
+    La memoria puede ser el almacén de oportunidades, que se consulta por URL sin cargar el historial,
+    o una lista de oportunidades.
+    """
+
+    def __init__(self, memory: Union[Container[str], List[Opportunity]], seen: Optional[IndiceVistos] = None):
+        self.memory = {opp.deal.url for opp in memory} if isinstance(memory, list) else memory
+        self.seen = seen
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.memory or (self.seen is not None and url in self.seen)
 
 
 class AgenteScanner(Agente):
 
     MODEL = "gpt-4o-mini"
+    # Ofertas que se piden al modelo si no se indica otra cantidad; el planeador la calcula según su presupuesto
+    DEALS = 5
+    # Tope de ofertas por llamada, para no desbordar la salida máxima del modelo ni forzarle a inventar ofertas
+    MAX_DEALS = int(os.getenv("SCANNER_MAX_DEALS", "20"))
 
-    SYSTEM_PROMPT = """Tú identificas y resumes las 5 ofertas más detalladas de una lista, seleccionando aquellas que tengan la descripción de producto más completa y detallada, y un precio claramente definido.
+    SYSTEM_PROMPT = """Tú identificas y resumes las {count} ofertas más detalladas de una lista, seleccionando aquellas que tengan la descripción de producto más completa y detallada, y un precio claramente definido.
     Responde estrictamente en formato JSON sin explicación adicional, utilizando este formato. Debes proporcionar el precio como un número obtenido de la descripción. Si el precio de una oferta no es claro, no la incluyas en tu respuesta.
-    Lo más importante es que respondas con las 5 ofertas que tengan la descripción de producto más detallada y clara. No es importante mencionar las condiciones del descuento; lo más relevante es la descripción del producto.
+    Lo más importante es que respondas con las {count} ofertas que tengan la descripción de producto más detallada y clara. No es importante mencionar las condiciones del descuento; lo más relevante es la descripción del producto.
     Ten cuidado con productos descritos como “$XXX de descuento” o “rebajado $XXX” — esto no es el precio real del producto. Solo responde cuando estés muy seguro del precio real.
     
     {"deals": [
@@ -22,16 +42,16 @@ class AgenteScanner(Agente):
         ...
     ]}"""
     
-    USER_PROMPT_PREFIX = """Responde con las 5 ofertas más prometedoras de esta lista, seleccionando aquellas que tengan la descripción del producto más detallada y de mayor calidad, y un precio claro mayor que 0.
+    USER_PROMPT_PREFIX = """Responde con las {count} ofertas más prometedoras de esta lista, seleccionando aquellas que tengan la descripción del producto más detallada y de mayor calidad, y un precio claro mayor que 0.
     Responde estrictamente en JSON, y solo JSON. Debes reescribir la descripción como un resumen del producto en sí, no de las condiciones de la oferta.
-    Recuerda incluir un párrafo completo de descripción por cada uno de los 5 productos seleccionados.
+    Recuerda incluir un párrafo completo de descripción por cada uno de los {count} productos seleccionados.
     Ten cuidado con productos descritos como “$XXX de descuento” o “rebajado $XXX” — ese no es el precio real del artículo. Solo responde cuando estés muy seguro del precio real.
     
     Ofertas:
     
     """
 
-    USER_PROMPT_SUFFIX = "\n\nResponde estrictamente en JSON e incluye exactamente 5 ofertas, ni más ni menos."
+    USER_PROMPT_SUFFIX = "\n\nResponde estrictamente en JSON e incluye exactamente {count} ofertas, ni más ni menos."
 
     name = "Agente Scanner"
     color = Agente.CYAN
@@ -41,49 +61,60 @@ class AgenteScanner(Agente):
         Configura esta instancia inicializando OpenAI
         """
         self.log("El Agente Scanner se está inicializando")
+        from openai import OpenAI
         self.openai = OpenAI()
+        self.tokens_used = 0
         self.log("El Agente Scanner está listo")
 
-    def fetch_deals(self, memory) -> List[ScrapedDeal]:
+    def fetch_deals(self, memory, seen: Optional[IndiceVistos] = None) -> List[ScrapedDeal]:
         """
         Busca ofertas publicadas en feeds RSS.
-        Devuelve las nuevas ofertas que no están ya en la memoria proporcionada.
+        Devuelve las nuevas ofertas que no están ya en la memoria proporcionada
+        ni, si se proporciona, en el índice de URLs ya estimadas.
         """
         self.log("El Agente Scanner va a obtener ofertas del feed RSS")
-        urls = [opp.deal.url for opp in memory]
-        scraped = ScrapedDeal.fetch()
-        result = [scrape for scrape in scraped if scrape.url not in urls]
+        known = UrlsConocidas(memory, seen)
+        result = ScrapedDeal.fetch(exclude=known)
         self.log(f"El Agente Scanner recibió {len(result)} ofertas que no estaban en la memoria")
         return result
 
-    def make_user_prompt(self, scraped) -> str:
+    def make_system_prompt(self, count: int) -> str:
+        return self.SYSTEM_PROMPT.replace("{count}", str(count))
+
+    def make_user_prompt(self, scraped, count: int = DEALS) -> str:
         """
         Crea un prompt de usuario para OpenAI basado en las ofertas recopiladas
         """
-        user_prompt = self.USER_PROMPT_PREFIX
+        user_prompt = self.USER_PROMPT_PREFIX.replace("{count}", str(count))
         user_prompt += '\n\n'.join([scrape.describe() for scrape in scraped])
-        user_prompt += self.USER_PROMPT_SUFFIX
+        user_prompt += self.USER_PROMPT_SUFFIX.replace("{count}", str(count))
         return user_prompt
 
-    def scan(self, memory: List[str]=[]) -> Optional[DealSelection]:
+    def scan(self, memory: List[str]=[], seen: Optional[IndiceVistos] = None, count: int = DEALS) -> Optional[DealSelection]:
         """
         Llama a OpenAI para proporcionar una lista de alto potencial con ofertas que tengan buenas descripciones y precios.
         Usa StructuredOutputs para asegurar que cumple nuestras especificaciones.
-        :param memory: una lista de URLs que representan ofertas ya procesadas
+        Deja en tokens_used los tokens de salida de la llamada, que cuentan para el presupuesto del planeador.
+        :param memory: las ofertas ya procesadas: el almacén de oportunidades o una lista de ellas
+        :param seen: índice opcional con las URLs de todas las ofertas ya estimadas
+        :param count: cuántas ofertas pedir al modelo; nunca más de las recibidas ni de MAX_DEALS
         :return: una selección de buenas ofertas, o None si no hay ninguna
         """
-        scraped = self.fetch_deals(memory)
+        scraped = self.fetch_deals(memory, seen)
+        self.tokens_used = 0
         if scraped:
-            user_prompt = self.make_user_prompt(scraped)
+            count = max(1, min(count, len(scraped), self.MAX_DEALS))
+            user_prompt = self.make_user_prompt(scraped, count)
             self.log("El Agente Scanner está llamando a OpenAI usando Structured Output")
             result = self.openai.beta.chat.completions.parse(
                 model=self.MODEL,
                 messages=[
-                    {"role": "system", "content": self.SYSTEM_PROMPT},
+                    {"role": "system", "content": self.make_system_prompt(count)},
                     {"role": "user", "content": user_prompt}
               ],
                 response_format=DealSelection
             )
+            self.tokens_used = result.usage.completion_tokens if result.usage else 0
             result = result.choices[0].message.parsed
             result.deals = [deal for deal in result.deals if deal.price>0]
             self.log(f"El Agente Scanner recibió {len(result.deals)} ofertas seleccionadas con precio>0 de OpenAI")
@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+import requests
+from agentes.deals import Opportunity
+from agentes.envio_push import EnvioPushover
+from agentes.indice_vistos import normalize_url
+
+
+class CuboTokens:
+    """
+    Limitador de tipo token bucket: admite ráfagas de hasta burst envíos y repone rate tokens por segundo
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """
+        Consume un token si hay alguno disponible, sin bloquear
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class Canal:
+    """
+    Canal de salida de alertas. Cada subclase fija su propio límite de envíos con RATE (por segundo)
+    y BURST; RATE = None significa sin límite.
+    """
+
+    name = ""
+    RATE: Optional[float] = None
+    BURST = 1
+
+    def __init__(self):
+        self.bucket = CuboTokens(self.RATE, self.BURST) if self.RATE is not None else None
+
+    def allow(self) -> bool:
+        return self.bucket is None or self.bucket.try_acquire()
+
+    def send(self, text: str, opportunity: Opportunity) -> None:
+        raise NotImplementedError
+
+
+class CanalPushover(Canal):
+    """
+    Notificaciones push de Pushover. El límite respeta la cuota mensual gratuita (10.000 mensajes)
+    """
+
+    name = "pushover"
+    RATE = 10 / 3600
+    BURST = 5
+
+    def __init__(self, token: str, user: str, url: str = EnvioPushover.URL):
+        super().__init__()
+        self.sender = EnvioPushover(token, user, url=url)
+
+    def send(self, text: str, opportunity: Opportunity) -> None:
+        self.sender.send(text)
+
+
+class CanalWebhook(Canal):
+    """
+    POST con la oportunidad en JSON a una URL
+    """
+
+    name = "webhook"
+    RATE = 1.0
+    BURST = 10
+    TIMEOUT = 10
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.url = url
+        self.session = requests.Session()
+
+    def send(self, text: str, opportunity: Opportunity) -> None:
+        payload = {"text": text, "opportunity": opportunity.model_dump()}
+        self.session.post(self.url, json=payload, timeout=self.TIMEOUT).raise_for_status()
+
+
+class CanalSmtp(Canal):
+    """
+    Correo electrónico a través de un servidor SMTP (por defecto uno local en el puerto 1025)
+    """
+
+    name = "smtp"
+    RATE = 30 / 3600
+    BURST = 5
+    TIMEOUT = 10
+
+    def __init__(self, host: str, port: int, sender: str, recipients: List[str]):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+
+    def send(self, text: str, opportunity: Opportunity) -> None:
+        message = EmailMessage()
+        message["Subject"] = f"Al Precio: {opportunity.deal.product_description[:60]}"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message.set_content(text)
+        with smtplib.SMTP(self.host, self.port, timeout=self.TIMEOUT) as smtp:
+            smtp.send_message(message)
+
+
+class CanalArchivo(Canal):
+    """
+    Añade cada alerta como una línea JSON a un fichero
+    """
+
+    name = "file"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, text: str, opportunity: Opportunity) -> None:
+        line = json.dumps({"sent_at": time.time(), "text": text, "opportunity": opportunity.model_dump()}, ensure_ascii=False)
+        with self.lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+def channels_from_env() -> List[Canal]:
+    """
+    Construye los canales indicados en ALERT_CHANNELS (separados por comas) con su configuración del entorno
+    """
+    channels = []
+    for name in [name.strip() for name in os.getenv("ALERT_CHANNELS", "pushover").split(",") if name.strip()]:
+        if name == "pushover":
+            channels.append(CanalPushover(
+                os.getenv("PUSHOVER_TOKEN"), os.getenv("PUSHOVER_USER"), url=os.getenv("PUSHOVER_URL", EnvioPushover.URL),
+            ))
+        elif name == "webhook":
+            channels.append(CanalWebhook(os.environ["ALERT_WEBHOOK_URL"]))
+        elif name == "smtp":
+            channels.append(CanalSmtp(
+                os.getenv("ALERT_SMTP_HOST", "localhost"),
+                int(os.getenv("ALERT_SMTP_PORT", "1025")),
+                os.getenv("ALERT_SMTP_FROM", "alprecio@localhost"),
+                [address.strip() for address in os.getenv("ALERT_SMTP_TO", "alertas@localhost").split(",")],
+            ))
+        elif name == "file":
+            channels.append(CanalArchivo(os.getenv("ALERT_FILE", "alerts.jsonl")))
+        else:
+            raise ValueError(f"Canal de alertas desconocido: {name}")
+    return channels
+
+
+class DespachadorAlertas:
+    """
+    Reparte cada alerta entre todos los canales a la vez desde un pool de hilos, así que dispatch
+    vuelve al instante. Una misma oferta (por URL normalizada) solo se alerta una vez, y cada canal
+    descarta los envíos que superan su límite en lugar de agotar la cuota del proveedor.
+    """
+
+    MAX_WORKERS = 4
+    REMEMBERED_URLS = 10000
+
+    def __init__(self, channels: List[Canal]):
+        self.channels = channels
+        self.executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="alertas")
+        self.lock = threading.Lock()
+        self.alerted: OrderedDict[str, None] = OrderedDict()
+
+    def _remember(self, url: str) -> None:
+        """
+        Registra la URL como alertada; debe llamarse con self.lock adquirido
+        """
+        self.alerted[url] = None
+        self.alerted.move_to_end(url)
+        if len(self.alerted) > self.REMEMBERED_URLS:
+            self.alerted.popitem(last=False)
+
+    def dispatch(self, text: str, opportunity: Opportunity, force: bool = False) -> Dict[str, bool]:
+        """
+        Encola la alerta en cada canal que tenga cupo. La oferta solo se da por alertada si algún canal
+        la aceptó, así que una alerta que todos los canales descartan se puede volver a intentar.
+        :param force: envía aunque la oferta ya se hubiera alertado
+        :return: para cada canal, si la alerta se encoló
+        """
+        url = normalize_url(opportunity.deal.url)
+        with self.lock:
+            if url in self.alerted and not force:
+                logging.info(f"Alerta omitida, la oferta ya se había notificado: {opportunity.deal.url}")
+                return {channel.name: False for channel in self.channels}
+            accepted = {channel.name: channel.allow() for channel in self.channels}
+            if any(accepted.values()):
+                self._remember(url)
+        for channel in self.channels:
+            if accepted[channel.name]:
+                self.executor.submit(self._send, channel, text, opportunity)
+            else:
+                logging.warning(f"Alerta descartada en el canal {channel.name}: se ha superado su límite de envíos")
+        return accepted
+
+    @staticmethod
+    def _send(channel: Canal, text: str, opportunity: Opportunity) -> None:
+        try:
+            channel.send(text, opportunity)
+        except Exception as e:
+            logging.warning(f"Fallo al enviar la alerta por {channel.name}: {e}")
@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+from typing import Optional, Self
+import numpy as np
+
+
+class BosqueCompacto:
+    """
+    Formato de inferencia compacto para un RandomForestRegressor de sklearn.
+    Todos los árboles se aplanan en arrays contiguos (característica, umbral, hijos y valor de
+    cada nodo) que se guardan como .npy y se abren mapeados en memoria, así que cargarlo
+    tarda milisegundos. La predicción avanza todas las filas por todos los árboles a la vez
+    con operaciones vectorizadas de NumPy, un nivel de profundidad por iteración.
+    """
+
+    FILES = ["feature", "threshold", "left", "right", "value", "roots"]
+
+    def __init__(self, feature, threshold, left, right, value, roots, depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.n_features = n_features
+
+    @classmethod
+    def from_sklearn(cls, model) -> Self:
+        """
+        Aplana los árboles de un RandomForestRegressor ya entrenado
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            left = tree.children_left.astype(np.int64)
+            right = tree.children_right.astype(np.int64)
+            leaf = left == -1
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            # Las hojas apuntan a sí mismas: seguir avanzando no las mueve
+            own = np.arange(tree.node_count, dtype=np.int64) + offset
+            lefts.append(np.where(leaf, own, left + offset))
+            rights.append(np.where(leaf, own, right + offset))
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+            offset += tree.node_count
+        depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts), np.concatenate(rights),
+            np.concatenate(values), np.array(roots, dtype=np.int64), depth, model.n_features_in_,
+        )
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name in self.FILES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "meta.json"), "w") as file:
+            json.dump({"depth": self.depth, "n_features": self.n_features}, file)
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        """
+        Abre un bosque guardado con save, mapeando los arrays en memoria
+        """
+        with open(os.path.join(path, "meta.json")) as file:
+            meta = json.load(file)
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in cls.FILES]
+        return cls(*arrays, depth=meta["depth"], n_features=meta["n_features"])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predice como RandomForestRegressor.predict: media de la hoja alcanzada en cada árbol
+        """
+        # sklearn compara las características en float32 con umbrales en float64
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=1)
+
+
+def convert(model_path: str, path: str, sample: Optional[np.ndarray] = None, tolerance: float = 1e-6) -> BosqueCompacto:
+    """
+    Convierte un RandomForestRegressor guardado con joblib al formato compacto,
+    comprobando antes de guardarlo que sus predicciones coinciden con las de sklearn
+    """
+    import joblib
+    model = joblib.load(model_path)
+    forest = BosqueCompacto.from_sklearn(model)
+    if sample is None:
+        sample = np.random.default_rng(0).normal(0, 0.1, size=(256, forest.n_features))
+    difference = np.max(np.abs(forest.predict(sample) - model.predict(sample)))
+    if difference > tolerance:
+        raise ValueError(f"El bosque compacto difiere de sklearn en {difference}")
+    forest.save(path)
+    return forest
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "src/random_forest_model.pkl"
+    target = sys.argv[2] if len(sys.argv) > 2 else "src/random_forest_compacto"
+    convert(source, target)
+    print(f"Bosque compacto guardado en {target}")
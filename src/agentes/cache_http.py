@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+import requests
+
+
+class CacheHttp:
+    """
+    Caché HTTP persistente en SQLite.
+    Guarda el cuerpo de cada respuesta junto con su ETag y Last-Modified para
+    revalidar con peticiones condicionales (If-None-Match / If-Modified-Since).
+    Cada EVICT_EVERY escrituras se eliminan las respuestas caducadas y las que exceden
+    max_entries, de modo que en procesos de larga duración el fichero no crece sin límite.
+    """
+
+    MAX_AGE = 7 * 24 * 3600
+    MAX_ENTRIES = 2000
+    EVICT_EVERY = 50
+
+    def __init__(self, path: str, max_age: float = MAX_AGE, max_entries: int = MAX_ENTRIES):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.writes = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                validated_at REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_validated_at ON responses (validated_at)")
+        self.db.commit()
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Elimina las respuestas que no se han validado dentro de max_age y, si aún quedan más
+        de max_entries, las validadas hace más tiempo
+        :return: el número de entradas eliminadas
+        """
+        with self.lock, self.db:
+            expired = self.db.execute("DELETE FROM responses WHERE validated_at < ?", (time.time() - self.max_age,)).rowcount
+            excess = self.db.execute(
+                "DELETE FROM responses WHERE url NOT IN (SELECT url FROM responses ORDER BY validated_at DESC LIMIT ?)",
+                (self.max_entries,),
+            ).rowcount
+        return expired + excess
+
+    def _lookup(self, url: str) -> Optional[tuple]:
+        with self.lock:
+            return self.db.execute(
+                "SELECT body, etag, last_modified, validated_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _store(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, validated_at) VALUES (?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, time.time()),
+            )
+            self.db.commit()
+            self.writes += 1
+            due = self.writes % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def _touch(self, url: str) -> None:
+        with self.lock:
+            self.db.execute("UPDATE responses SET validated_at = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+
+    def get(self, url: str, fresh_for: float, request: Callable[[Dict[str, str]], requests.Response]) -> bytes:
+        """
+        Devuelve el cuerpo de la URL.
+        Si la copia guardada se validó hace menos de fresh_for segundos no se hace ninguna petición;
+        si no, se revalida con una petición condicional y un 304 reutiliza la copia guardada.
+        :param url: la URL a recuperar
+        :param fresh_for: segundos durante los que una copia se considera fresca
+        :param request: función que realiza el GET con las cabeceras indicadas
+        :return: el cuerpo de la respuesta
+        """
+        cached = self._lookup(url)
+        headers = {}
+        if cached:
+            body, etag, last_modified, validated_at = cached
+            if time.time() - validated_at < fresh_for:
+                return body
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = request(headers)
+        if cached and response.status_code == 304:
+            self._touch(url)
+            return cached[0]
+        response.raise_for_status()
+        self._store(url, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.content
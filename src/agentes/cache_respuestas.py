@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class CacheRespuestas:
+    """
+    Caché persistente en SQLite de las estimaciones de precio devueltas por modelos remotos.
+    La clave es el hash del modelo y del prompt completo; las entradas caducan tras ttl
+    segundos y, superado max_entries, se eliminan las usadas hace más tiempo.
+    """
+
+    TTL = 7 * 24 * 3600
+    MAX_ENTRIES = 20_000
+
+    def __init__(self, path: str, ttl: float = TTL, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                value REAL NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+        self.db.commit()
+
+    @staticmethod
+    def key(model: str, prompt) -> str:
+        """
+        Calcula la clave de una llamada a partir del modelo y del prompt (texto o mensajes)
+        """
+        payload = json.dumps([model, prompt], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[float]:
+        """
+        Devuelve la respuesta guardada si existe y no ha caducado
+        """
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] < self.ttl:
+                self.hits += 1
+                self.db.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+                self.db.commit()
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, model: str, value: float) -> None:
+        """
+        Guarda una respuesta y aplica la caducidad y el límite de tamaño
+        """
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, value, now, now),
+            )
+            self.db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self.db.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?
+                )""", (self.max_entries,))
+            self.db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Devuelve las métricas de aciertos y fallos desde que arrancó el proceso
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+_cache: Optional[CacheRespuestas] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> CacheRespuestas:
+    """
+    Devuelve la caché de respuestas compartida, abriéndola la primera vez que se necesita
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheRespuestas(LLM_CACHE_PATH)
+        return _cache
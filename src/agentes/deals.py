@@ -1,11 +1,17 @@
 from pydantic import BaseModel
-from typing import List, Dict, Self
-from bs4 import BeautifulSoup
-import re
+from typing import Container, List, Dict, Optional, Self
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import logging
+import os
+import threading
 import feedparser
 from tqdm import tqdm
 import requests
 import time
+from agentes.cache_http import CacheHttp
+from agentes.extractores import get_extractor
+from agentes.indice_vistos import normalize_url
 
 feeds = [
     "https://www.dealnews.com/c142/Electronics/?rss=1",
@@ -15,49 +21,148 @@ feeds = [
         "https://www.dealnews.com/c196/Home-Garden/?rss=1",
        ]
 
+ENTRIES_PER_FEED = 10
+MAX_WORKERS = 8
+REQUEST_TIMEOUT = 10
+HOST_INTERVAL = 0.1
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "http_cache.sqlite")
+FEED_FRESH_FOR = 60
+PAGE_FRESH_FOR = 24 * 3600
+
+
+class LimitadorPorHost:
+    """
+    Espacia las peticiones dirigidas a un mismo host, en lugar de dormir tras cada descarga
+    """
+
+    def __init__(self, interval: float = HOST_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot: Dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        """
+        Bloquea hasta que le toque el turno a este host
+        """
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+limiter = LimitadorPorHost()
+extractor = get_extractor()
+_local = threading.local()
+_cache: Optional[CacheHttp] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> CacheHttp:
+    """
+    Devuelve la caché HTTP compartida, abriéndola la primera vez que se necesita
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheHttp(HTTP_CACHE_PATH)
+        return _cache
+
+
+def get_session() -> requests.Session:
+    """
+    Devuelve una sesión HTTP por hilo, reutilizando conexiones keep-alive
+    """
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def download(url: str, fresh_for: float = PAGE_FRESH_FOR) -> bytes:
+    """
+    Descarga una URL a través de la caché HTTP, respetando el límite por host y el timeout.
+    Las copias frescas no generan petición alguna; las demás se revalidan de forma condicional.
+    """
+    def request(headers):
+        limiter.wait(url)
+        return get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+
+    return get_cache().get(url, fresh_for, request)
+
+
+def fetch_entries(feed_url: str) -> List[Dict]:
+    """
+    Descarga y parsea un feed RSS, devolviendo sus primeras entradas
+    """
+    feed = feedparser.parse(download(feed_url, fresh_for=FEED_FRESH_FOR))
+    return feed.entries[:ENTRIES_PER_FEED]
+
+
 def extract(html_snippet: str) -> str:
     """
-    Usa Beautiful Soup para limpiar este fragmento HTML y extraer texto útil
-    """
-    soup = BeautifulSoup(html_snippet, 'html.parser')
-    snippet_div = soup.find('div', class_='snippet summary')
-    
-    if snippet_div:
-        description = snippet_div.get_text(strip=True)
-        description = BeautifulSoup(description, 'html.parser').get_text()
-        description = re.sub('<[^<]+?>', '', description)
-        result = description.strip()
-    else:
+    Usa el extractor HTML configurado para limpiar este fragmento HTML y extraer texto útil
+    """
+    result = extractor.summary(html_snippet)
+    if result is None:
         result = html_snippet
     return result.replace('\n', ' ')
 
 class ScrapedDeal:
     """
-    Una clase para representar una Oferta obtenida de un feed RSS
+    Una clase para representar una Oferta obtenida de un feed RSS.
+    El título, el resumen y la URL salen de la entrada del feed; los detalles
+    requieren descargar la página de la oferta y se cargan solo cuando se necesitan.
     """
     category: str
     title: str
     summary: str
     url: str
-    details: str
-    features: str
 
-    def __init__(self, entry: Dict[str, str]):
+    def __init__(self, entry: Dict[str, str], stuff: Optional[bytes] = None):
         """
         Rellena esta instancia basándose en el diccionario proporcionado
         """
         self.title = entry['title']
         self.summary = extract(entry['summary'])
         self.url = entry['links'][0]['href']
-        stuff = requests.get(self.url).content
-        soup = BeautifulSoup(stuff, 'html.parser')
-        content = soup.find('div', class_='content-section').get_text()
+        self._details = None
+        self._features = None
+        if stuff is not None:
+            self.load(stuff)
+
+    def load(self, stuff: Optional[bytes] = None) -> Self:
+        """
+        Descarga (si no se proporciona) y parsea la página de la oferta para rellenar detalles y características
+        """
+        if stuff is None:
+            stuff = download(self.url)
+        content = extractor.content(stuff)
         content = content.replace('\nmore', '').replace('\n', ' ')
         if "Features" in content:
-            self.details, self.features = content.split("Features")
+            self._details, self._features = content.split("Features")
         else:
-            self.details = content
-            self.features = ""
+            self._details = content
+            self._features = ""
+        return self
+
+    @property
+    def loaded(self) -> bool:
+        return self._details is not None
+
+    @property
+    def details(self) -> str:
+        if not self.loaded:
+            self.load()
+        return self._details
+
+    @property
+    def features(self) -> str:
+        if not self.loaded:
+            self.load()
+        return self._features
 
     def __repr__(self):
         """
@@ -72,19 +177,54 @@ class ScrapedDeal:
         return f"Title: {self.title}\nDetails: {self.details.strip()}\nFeatures: {self.features.strip()}\nURL: {self.url}"
 
     @classmethod
-    def fetch(cls, show_progress : bool = False) -> List[Self]:
+    def fetch_pending(cls, exclude: Optional[Container[str]] = None) -> List[Self]:
         """
-        Recupera todas las ofertas de los feeds RSS seleccionados
+        Etapa barata: lee los feeds RSS en paralelo y crea las ofertas sin descargar sus páginas
+        :param exclude: URLs ya conocidas que se descartan
+        :return: las ofertas nuevas y sin repetir, con los detalles todavía sin cargar
         """
+        exclude = exclude if exclude is not None else set()
+        seen = set()
+        with ThreadPoolExecutor(max_workers=len(feeds)) as executor:
+            futures = [(url, executor.submit(fetch_entries, url)) for url in feeds]
+            entries = []
+            for feed_url, future in futures:
+                try:
+                    entries.extend(future.result())
+                except Exception as e:
+                    logging.warning(f"No se pudo leer el feed {feed_url}: {e}")
         deals = []
-        feed_iter = tqdm(feeds) if show_progress else feeds
-        for feed_url in feed_iter:
-            feed = feedparser.parse(feed_url)
-            for entry in feed.entries[:10]:
-                deals.append(cls(entry))
-                time.sleep(0.5)
+        for entry in entries:
+            deal = cls(entry)
+            # La misma oferta aparece en varios feeds con distintos parámetros de seguimiento
+            key = normalize_url(deal.url)
+            if key not in seen and deal.url not in exclude:
+                seen.add(key)
+                deals.append(deal)
         return deals
 
+    @classmethod
+    def fetch(cls, show_progress : bool = False, exclude: Optional[Container[str]] = None) -> List[Self]:
+        """
+        Recupera todas las ofertas de los feeds RSS seleccionados.
+        Solo se descargan las páginas de las ofertas cuya URL no está en exclude; las descargas
+        se hacen en un pool acotado y una oferta que falla se descarta sin detener al resto.
+        :param show_progress: muestra una barra de progreso de las descargas
+        :param exclude: URLs ya conocidas, que no se descargan ni se devuelven
+        """
+        pending = cls.fetch_pending(exclude)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {executor.submit(deal.load): deal for deal in pending}
+            done = as_completed(futures)
+            if show_progress:
+                done = tqdm(done, total=len(futures))
+            for future in done:
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.warning(f"No se pudo obtener la oferta {futures[future].url}: {e}")
+        return [deal for deal in pending if deal.loaded]
+
 class Deal(BaseModel):
     """
     Una clase para representar una Oferta con una descripción resumida
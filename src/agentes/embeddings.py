@@ -0,0 +1,221 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Self
+import numpy as np
+from agentes.perezoso import perezoso
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+class CacheEmbeddingsDisco:
+    """
+    Caché persistente de embeddings.
+    Los vectores viven en una matriz float32 mapeada en memoria (vectores.npy) y un índice SQLite
+    asocia el hash del texto normalizado y del modelo a su fila. Con la matriz llena se reutiliza
+    la fila usada hace más tiempo.
+    """
+
+    CAPACITY = 50_000
+
+    def __init__(self, path: str, capacity: int = CAPACITY):
+        os.makedirs(path, exist_ok=True)
+        self.matrix_path = os.path.join(path, "vectores.npy")
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(path, "indice.sqlite"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER UNIQUE, used_at REAL)")
+        self.db.commit()
+        self.vectors = None
+        if os.path.exists(self.matrix_path):
+            self.vectors = np.lib.format.open_memmap(self.matrix_path, mode='r+')
+            self.capacity = self.vectors.shape[0]
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        """
+        Calcula la clave de un texto: hash del nombre del modelo y del texto con los espacios normalizados
+        """
+        normalized = ' '.join(text.split())
+        return hashlib.sha256(f"{model_name}\0{normalized}".encode()).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Devuelve los vectores guardados para las claves indicadas que estén en la caché
+        """
+        if self.vectors is None or not keys:
+            return {}
+        with self.lock:
+            found = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ','.join('?' * len(chunk))
+                rows = self.db.execute(f"SELECT key, slot FROM entries WHERE key IN ({marks})", chunk).fetchall()
+                found.update({key: np.array(self.vectors[slot]) for key, slot in rows})
+            now = time.time()
+            self.db.executemany("UPDATE entries SET used_at = ? WHERE key = ?", [(now, key) for key in found])
+            self.db.commit()
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """
+        Guarda los vectores indicados, expulsando los menos usados si la matriz está llena
+        """
+        if not vectors:
+            return
+        with self.lock:
+            if self.vectors is None:
+                dimensions = len(next(iter(vectors.values())))
+                self.vectors = np.lib.format.open_memmap(
+                    self.matrix_path, mode='w+', dtype=np.float32, shape=(self.capacity, dimensions)
+                )
+            now = time.time()
+            for key, vector in vectors.items():
+                row = self.db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                if row:
+                    slot = row[0]
+                else:
+                    count = self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                    if count < self.capacity:
+                        slot = count
+                    else:
+                        slot = self.db.execute("SELECT slot FROM entries ORDER BY used_at LIMIT 1").fetchone()[0]
+                        self.db.execute("DELETE FROM entries WHERE slot = ?", (slot,))
+                self.vectors[slot] = vector
+                self.db.execute("INSERT OR REPLACE INTO entries (key, slot, used_at) VALUES (?, ?, ?)", (key, slot, now))
+            self.vectors.flush()
+            self.db.commit()
+
+
+BACKENDS = ["torch", "torch-int8", "onnx", "onnx-int8"]
+ONNX_INT8_FILE = os.getenv("EMBEDDINGS_ONNX_INT8_FILE", "onnx/model_qint8_avx2.onnx")
+
+
+def load_model(model_name: str, backend: str = "torch") -> "SentenceTransformer":
+    """
+    Carga el SentenceTransformer en CPU con el backend de inferencia indicado:
+    - torch: PyTorch en float32, el backend original
+    - torch-int8: PyTorch con cuantización dinámica int8 de las capas lineales
+    - onnx: ONNX Runtime (requiere sentence-transformers[onnx])
+    - onnx-int8: ONNX Runtime con el modelo cuantizado int8 publicado en el repositorio del modelo
+    Todos producen vectores compatibles con los de la colección 'products' de Chroma.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de embeddings desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+    # Se importa aquí: sentence_transformers arrastra torch y es la importación más lenta del arranque
+    from sentence_transformers import SentenceTransformer
+    if backend == "onnx":
+        return SentenceTransformer(model_name, device='cpu', backend="onnx")
+    if backend == "onnx-int8":
+        return SentenceTransformer(model_name, device='cpu', backend="onnx", model_kwargs={"file_name": ONNX_INT8_FILE})
+    try:
+        model = SentenceTransformer(model_name, device='cpu')
+    except RuntimeError:
+        model = SentenceTransformer(model_name).to('cpu')
+    if backend == "torch-int8":
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+class ServicioEmbeddings:
+    """
+    Servicio de embeddings compartido por todo el proceso.
+    Mantiene una única instancia del SentenceTransformer y una caché LRU de texto a vector,
+    de modo que cada descripción se codifica una sola vez aunque la pidan varios agentes.
+    Por debajo usa la caché persistente en disco, y el modelo solo se carga la primera vez
+    que hace falta codificar un texto que no está en ninguna de las dos cachés.
+    """
+
+    MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+    BACKEND = os.getenv("EMBEDDINGS_BACKEND", "torch")
+    CACHE_SIZE = 4096
+    DISK_CACHE_PATH = os.getenv("EMBEDDINGS_CACHE_PATH", "embeddings_cache")
+
+    _instance: Optional[Self] = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> Self:
+        """
+        Devuelve la instancia compartida, creándola la primera vez
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self, model_name: str = MODEL, backend: str = BACKEND, cache_size: int = CACHE_SIZE,
+                 disk_cache_path: Optional[str] = DISK_CACHE_PATH):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de embeddings desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+        self.model_name = model_name
+        self.backend = backend
+        # Los vectores de cada backend se guardan por separado en la caché de disco
+        self.cache_key = model_name if backend == "torch" else f"{model_name}|{backend}"
+        self.cache_size = cache_size
+        self.disk = CacheEmbeddingsDisco(disk_cache_path) if disk_cache_path else None
+        self.cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @perezoso
+    def model(self) -> "SentenceTransformer":
+        """
+        Carga el SentenceTransformer la primera vez que se necesita; si varios hilos lo piden
+        a la vez (por ejemplo la precarga y la primera ejecución), se carga una sola vez
+        """
+        return load_model(self.model_name, self.backend)
+
+    def dimensions(self) -> int:
+        """
+        Dimensión de los vectores, sin cargar el modelo si ya se conoce por alguna de las cachés.
+        Debe llamarse con self.lock adquirido.
+        """
+        if self.cache:
+            return len(next(iter(self.cache.values())))
+        if self.disk and self.disk.vectors is not None:
+            return self.disk.vectors.shape[1]
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Codifica los textos, reutilizando los vectores ya calculados y codificando
+        en un solo lote los que faltan
+        :param texts: los textos a codificar
+        :return: una matriz float32 con un vector por texto, en el mismo orden
+        """
+        with self.lock:
+            if not texts:
+                return np.empty((0, self.dimensions()), dtype=np.float32)
+            missing = list(dict.fromkeys(text for text in texts if text not in self.cache))
+            self.hits += len(texts) - len(missing)
+            if missing and self.disk:
+                keys = {text: self.disk.key(self.cache_key, text) for text in missing}
+                stored = self.disk.get_many(list(keys.values()))
+                for text in missing:
+                    if keys[text] in stored:
+                        self.cache[text] = stored[keys[text]]
+                missing = [text for text in missing if text not in self.cache]
+                self.disk_hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            if missing:
+                vectors = self.model.encode(missing, convert_to_numpy=True).astype(np.float32)
+                for text, vector in zip(missing, vectors):
+                    self.cache[text] = vector
+                if self.disk:
+                    self.disk.put_many({self.disk.key(self.cache_key, text): vector for text, vector in zip(missing, vectors)})
+            result = []
+            for text in texts:
+                self.cache.move_to_end(text)
+                result.append(self.cache[text])
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return np.stack(result)
@@ -0,0 +1,165 @@
+import atexit
+import http.client
+import logging
+import queue
+import threading
+import time
+import urllib.parse
+from typing import Dict, List, Optional
+
+
+class ErrorEnvio(Exception):
+    """
+    Fallo al entregar una notificación; retryable indica si merece la pena reintentarlo
+    """
+
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class ConexionPersistente:
+    """
+    Conexión HTTP(S) keep-alive hacia un único servidor.
+    Se abre la primera vez que se usa y se reabre solo si el servidor la cierra o falla,
+    así que el handshake TLS se paga una vez y no en cada mensaje.
+    """
+
+    def __init__(self, url: str, timeout: float = 10):
+        parts = urllib.parse.urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.path = parts.path or "/"
+        self.timeout = timeout
+        self.connection: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.connection is None:
+            factory = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self.connection = factory(self.netloc, timeout=self.timeout)
+        return self.connection
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def post(self, fields: Dict[str, str]) -> int:
+        """
+        Envía un formulario por POST y devuelve el código de estado.
+        El cuerpo de la respuesta se lee entero para poder reutilizar la conexión.
+        """
+        body = urllib.parse.urlencode(fields)
+        headers = {"Content-type": "application/x-www-form-urlencoded", "Connection": "keep-alive"}
+        try:
+            connection = self._connect()
+            connection.request("POST", self.path, body, headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if response.will_close:
+            self.close()
+        return response.status
+
+
+class EnvioPushover:
+    """
+    Envía notificaciones de Pushover desde un hilo en segundo plano, así que send vuelve al instante.
+    Los mensajes que llegan dentro de una ventana de coalesce_window segundos se agrupan en un
+    único resumen, los fallos transitorios (errores de red, 429, 5xx) se reintentan con espera
+    exponencial y todos los envíos reutilizan la misma conexión keep-alive.
+    """
+
+    URL = "https://api.pushover.net/1/messages.json"
+    MAX_LENGTH = 1024
+    COALESCE_WINDOW = 2.0
+    RETRIES = 4
+    BACKOFF = 1.0
+
+    def __init__(self, token: str, user: str, url: str = URL, coalesce_window: float = COALESCE_WINDOW,
+                 retries: int = RETRIES, backoff: float = BACKOFF):
+        self.token = token
+        self.user = user
+        self.coalesce_window = coalesce_window
+        self.retries = retries
+        self.backoff = backoff
+        self.connection = ConexionPersistente(url)
+        self.queue: queue.Queue = queue.Queue()
+        self.thread = threading.Thread(target=self._deliver_forever, name="pushover", daemon=True)
+        self.thread.start()
+        # Que no se pierdan los mensajes pendientes si el proceso termina justo después de una ejecución
+        atexit.register(self.flush, 10)
+
+    def send(self, text: str) -> None:
+        """
+        Encola el mensaje para enviarlo en segundo plano
+        """
+        self.queue.put(text)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se hayan entregado (o descartado) todos los mensajes encolados
+        :return: True si la cola quedó vacía antes del timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _next_batch(self) -> List[str]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.coalesce_window
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver_forever(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                for message in digest(batch, self.MAX_LENGTH):
+                    self._deliver(message)
+            except Exception as e:
+                logging.warning(f"No se pudieron enviar {len(batch)} notificaciones push: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _deliver(self, message: str) -> None:
+        fields = {"token": self.token, "user": self.user, "message": message, "sound": "classical"}
+        for attempt in range(self.retries + 1):
+            try:
+                status = self.connection.post(fields)
+                if status < 300:
+                    return
+                error = ErrorEnvio(f"Pushover respondió {status}", retryable=status == 429 or status >= 500)
+            except (OSError, http.client.HTTPException) as e:
+                error = ErrorEnvio(str(e), retryable=True)
+            if not error.retryable or attempt == self.retries:
+                raise error
+            time.sleep(self.backoff * 2 ** attempt)
+
+
+def digest(texts: List[str], max_length: int) -> List[str]:
+    """
+    Agrupa los mensajes en el menor número de notificaciones de como mucho max_length caracteres
+    """
+    messages, current = [], ""
+    for text in texts:
+        text = text[:max_length]
+        if current and len(current) + 2 + len(text) > max_length:
+            messages.append(current)
+            current = ""
+        current = f"{current}\n\n{text}" if current else text
+    if current:
+        messages.append(current)
+    return messages
@@ -0,0 +1,111 @@
+import os
+import re
+from typing import Dict, Optional, Type
+from bs4 import BeautifulSoup, UnicodeDammit
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+TAGS = re.compile('<[^<]+?>')
+
+
+class ExtractorBeautifulSoup:
+    """
+    Extractor de referencia basado en BeautifulSoup con el parser html.parser, escrito en Python puro
+    """
+
+    name = "bs4"
+
+    def summary(self, html_snippet: str) -> Optional[str]:
+        """
+        Devuelve el texto del div 'snippet summary' de un resumen RSS, o None si no lo tiene
+        """
+        soup = BeautifulSoup(html_snippet, 'html.parser')
+        snippet_div = soup.find('div', class_='snippet summary')
+        if not snippet_div:
+            return None
+        description = snippet_div.get_text(strip=True)
+        description = BeautifulSoup(description, 'html.parser').get_text()
+        description = TAGS.sub('', description)
+        return description.strip()
+
+    def content(self, page: bytes) -> str:
+        """
+        Devuelve el texto completo del div 'content-section' de la página de una oferta
+        """
+        soup = BeautifulSoup(page, 'html.parser')
+        return soup.find('div', class_='content-section').get_text()
+
+
+class ExtractorLxml:
+    """
+    Extractor rápido basado en lxml (libxml2, en C) que solo recorre los nodos seleccionados
+    """
+
+    name = "lxml"
+
+    SUMMARY = '//div[@class="snippet summary"]'
+    CONTENT = '//div[contains(concat(" ", normalize-space(@class), " "), " content-section ")]'
+    TEXT = './/text()[not(ancestor::script) and not(ancestor::style)]'
+    # BeautifulSoup reduce cada nodo de texto formado solo por estos espacios a un salto de línea (o a un espacio
+    # si no contiene ninguno), salvo dentro de estas etiquetas
+    SPACES = ' \n\t\f\r'
+    PRESERVE_WHITESPACE = 'ancestor-or-self::pre or ancestor-or-self::textarea'
+
+    def summary(self, html_snippet: str) -> Optional[str]:
+        """
+        Devuelve el texto del div 'snippet summary' de un resumen RSS, o None si no lo tiene
+        """
+        if not html_snippet.strip():
+            return None
+        found = lxml.html.fromstring(html_snippet).xpath(self.SUMMARY)
+        if not found:
+            return None
+        description = ''.join(text.strip() for text in found[0].xpath(self.TEXT))
+        description = TAGS.sub('', description)
+        return description.strip()
+
+    def content(self, page: bytes) -> str:
+        """
+        Devuelve el texto completo del div 'content-section' de la página de una oferta
+        """
+        # Sin <meta charset>, libxml2 decodificaría los bytes como Latin-1; se detecta la codificación
+        # igual que hace BeautifulSoup en el extractor de referencia
+        if isinstance(page, bytes):
+            page = UnicodeDammit(page, is_html=True).unicode_markup
+        found = lxml.html.fromstring(page).xpath(self.CONTENT)
+        if not found:
+            raise ValueError("La página no tiene un div 'content-section'")
+        return ''.join(self.collapse(text) for text in found[0].xpath(self.TEXT))
+
+    def collapse(self, text) -> str:
+        """
+        Normaliza un nodo de texto como lo hace BeautifulSoup, para que el resultado coincida con el de referencia
+        """
+        if text.strip(self.SPACES):
+            return text
+        element = text.getparent()
+        if text.is_tail:
+            element = element.getparent()
+        if element is not None and element.xpath(self.PRESERVE_WHITESPACE):
+            return text
+        return '\n' if '\n' in text else ' '
+
+
+EXTRACTORS: Dict[str, Type] = {
+    ExtractorBeautifulSoup.name: ExtractorBeautifulSoup,
+    ExtractorLxml.name: ExtractorLxml,
+}
+
+
+def get_extractor(name: Optional[str] = None):
+    """
+    Crea el extractor indicado, o el configurado en HTML_EXTRACTOR.
+    Por defecto usa lxml y recurre a BeautifulSoup si lxml no está instalado.
+    """
+    name = name or os.getenv("HTML_EXTRACTOR", ExtractorLxml.name)
+    if name == ExtractorLxml.name and lxml is None:
+        name = ExtractorBeautifulSoup.name
+    return EXTRACTORS[name]()
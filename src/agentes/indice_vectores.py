@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from typing import List, Tuple
+import numpy as np
+
+
+class IndiceVectores:
+    """
+    Índice vectorial exacto en proceso, alternativa a collection.query de Chroma.
+    Se construye una vez a partir de la colección 'products' y se guarda en disco como arrays
+    compactos (vectores float32, normas, precios y documentos UTF-8 con sus offsets) que se
+    abren mapeados en memoria. La búsqueda es una multiplicación de matrices con NumPy que
+    ordena por distancia L2, igual que Chroma, y admite lotes de consultas.
+    """
+
+    PAGE_SIZE = 5000
+    REFRESH_INTERVAL = 300
+
+    def __init__(self, collection, path: str):
+        self.collection = collection
+        self.path = path
+        self.lock = threading.Lock()
+        self.checked_at = 0.0
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(self._file("offsets.npy")):
+            self._open()
+        else:
+            self._save(np.empty((0, 0), dtype=np.float32), np.empty(0), [], append=False)
+        self.refresh(force=True)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _open(self) -> None:
+        offsets = np.load(self._file("offsets.npy"), mmap_mode='r')
+        count = len(offsets) - 1
+        # offsets.npy se escribe el último, así que solo son válidas las filas y los bytes de documentos.bin que cubre:
+        # un refresco interrumpido puede haber dejado filas o bytes de más detrás
+        vectors = np.load(self._file("vectores.npy"), mmap_mode='r')[:count]
+        norms = np.load(self._file("normas.npy"), mmap_mode='r')[:count]
+        prices = np.load(self._file("precios.npy"), mmap_mode='r')[:count]
+        documents = np.memmap(self._file("documentos.bin"), dtype=np.uint8, mode='r')[:offsets[-1]] \
+            if offsets[-1] > 0 else np.empty(0, dtype=np.uint8)
+        if min(len(vectors), len(norms), len(prices)) < count or len(documents) < offsets[-1]:
+            # Una reconstrucción interrumpida deja los arrays por detrás de offsets.npy: se vuelve a empezar
+            self._save(np.empty((0, 0), dtype=np.float32), np.empty(0), [], append=False)
+            return
+        # Las búsquedas leen este estado de una vez, así un refresco concurrente no les mezcla arrays
+        self.state = (vectors, norms, prices, offsets, documents)
+        self.vectors, self.norms, self.prices, self.offsets, self.documents = self.state
+
+    def _save(self, vectors: np.ndarray, prices: np.ndarray, documents: List[str], append: bool) -> None:
+        """
+        Escribe los arrays del índice, añadiendo a los existentes si append es True
+        """
+        encoded = [document.encode() for document in documents]
+        offsets = np.cumsum([0] + [len(e) for e in encoded], dtype=np.int64)
+        if append:
+            offsets = offsets[1:] + self.offsets[-1]
+            vectors = np.concatenate([self.vectors, vectors])
+            prices = np.concatenate([self.prices, prices])
+            offsets = np.concatenate([self.offsets, offsets])
+        self._replace("vectores.npy", vectors.astype(np.float32))
+        self._replace("normas.npy", np.einsum('ij,ij->i', vectors, vectors).astype(np.float32))
+        self._replace("precios.npy", prices.astype(np.float32))
+        if append:
+            with open(self._file("documentos.bin"), "r+b") as file:
+                # Se descartan los bytes que un refresco interrumpido pudo dejar detrás del último documento válido
+                file.truncate(int(self.offsets[-1]))
+                file.seek(0, os.SEEK_END)
+                file.write(b''.join(encoded))
+        else:
+            with open(self._file("documentos.bin.tmp"), "wb") as file:
+                file.write(b''.join(encoded))
+            os.replace(self._file("documentos.bin.tmp"), self._file("documentos.bin"))
+        # offsets.npy se escribe el último: marca qué parte de documentos.bin es válida
+        self._replace("offsets.npy", offsets)
+        self._open()
+
+    def _replace(self, name: str, array: np.ndarray) -> None:
+        """
+        Escribe el array en un fichero temporal y lo renombra, sin truncar el que puedan tener mapeado las búsquedas
+        """
+        with open(self._file(name + ".tmp"), "wb") as file:
+            np.save(file, array)
+        os.replace(self._file(name + ".tmp"), self._file(name))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Añade al índice los productos nuevos de la colección; si la colección ha encogido, lo reconstruye.
+        Sin force, solo consulta la colección cada REFRESH_INTERVAL segundos.
+        :return: el número de productos añadidos
+        """
+        if not force and time.monotonic() - self.checked_at < self.REFRESH_INTERVAL:
+            return 0
+        with self.lock:
+            self.checked_at = time.monotonic()
+            count = self.collection.count()
+            if count < len(self):
+                self._save(np.empty((0, 0), dtype=np.float32), np.empty(0), [], append=False)
+            # Se leen todas las páginas nuevas y se escriben de una vez: reescribir los arrays en cada
+            # página haría que construir el índice completo fuera cuadrático
+            start = len(self)
+            vectors, prices, documents = [], [], []
+            while start + len(documents) < count:
+                result = self.collection.get(
+                    include=['embeddings', 'documents', 'metadatas'], limit=self.PAGE_SIZE, offset=start + len(documents)
+                )
+                if not result['documents']:
+                    break
+                vectors.append(np.array(result['embeddings'], dtype=np.float32))
+                prices.append(np.array([m['price'] for m in result['metadatas']], dtype=np.float32))
+                documents.extend(result['documents'])
+            if documents:
+                self._save(np.concatenate(vectors), np.concatenate(prices), documents, append=start > 0)
+            return len(documents)
+
+    def search(self, queries: np.ndarray, k: int = 5) -> List[Tuple[List[str], List[float]]]:
+        """
+        Busca los k productos más cercanos a cada vector de consulta
+        :param queries: matriz con un vector de consulta por fila
+        :return: para cada consulta, los documentos y los precios de sus k vecinos, del más cercano al más lejano
+        """
+        vectors, norms, prices, offsets, documents = self.state
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(offsets) - 1)
+        if k == 0:
+            return [([], []) for _ in queries]
+        # ||x - q||² = ||x||² - 2 x·q + ||q||², y ||q||² no cambia el orden para una misma consulta
+        distances = norms[None, :] - 2 * (queries @ vectors.T)
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(distances, nearest):
+            ordered = candidates[np.argsort(row[candidates])]
+            results.append((
+                [bytes(documents[offsets[i]:offsets[i + 1]]).decode() for i in ordered],
+                [float(prices[i]) for i in ordered],
+            ))
+        return results
@@ -0,0 +1,137 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# Parámetros de seguimiento que no identifican la oferta; un '*' final indica un prefijo.
+# dealnews añade iref=rss-<categoría> según el feed, así que una misma oferta llega con varias URLs.
+TRACKING_PARAMS = [param.strip().lower() for param in os.getenv("URL_TRACKING_PARAMS", "utm_*,iref").split(",") if param.strip()]
+
+
+def is_tracking(name: str, params: List[str] = TRACKING_PARAMS) -> bool:
+    name = name.lower()
+    return any(name.startswith(param[:-1]) if param.endswith("*") else name == param for param in params)
+
+
+def normalize_url(url: str, params: List[str] = TRACKING_PARAMS) -> str:
+    """
+    Normaliza una URL para comparar ofertas: esquema y host en minúsculas, sin fragmento,
+    sin parámetros de seguimiento (TRACKING_PARAMS) y sin barra final
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not is_tracking(k, params)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sencillo: nunca da falsos negativos y ocupa unos pocos bits por URL
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        a, b = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        return ((a + i * b) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class IndiceVistos:
+    """
+    Índice persistente de las URLs de todas las ofertas ya estimadas, hayan generado alerta o no.
+    Las URLs se normalizan y se guardan en SQLite con la fecha en que se vieron; las que superan
+    la ventana de caducidad vuelven a considerarse nuevas. En memoria se mantiene un diccionario
+    de URL a fecha o, con use_bloom, un filtro de Bloom que solo consulta SQLite ante un posible acierto.
+    """
+
+    EXPIRY = 30 * 24 * 3600
+
+    def __init__(self, path: str, expiry: float = EXPIRY, use_bloom: bool = False, bloom_capacity: int = 1_000_000):
+        self.expiry = expiry
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS estimates (
+                url TEXT PRIMARY KEY,
+                description TEXT NOT NULL,
+                price REAL NOT NULL,
+                estimate REAL NOT NULL,
+                full INTEGER NOT NULL,
+                seconds REAL,
+                priced_at REAL NOT NULL
+            )""")
+        self.db.execute("DELETE FROM seen WHERE seen_at < ?", (time.time() - expiry,))
+        self.db.execute("DELETE FROM estimates WHERE priced_at < ?", (time.time() - expiry,))
+        self.db.commit()
+        self.bloom: Optional[FiltroBloom] = FiltroBloom(bloom_capacity) if use_bloom else None
+        self.urls: Dict[str, float] = {}
+        for url, seen_at in self.db.execute("SELECT url, seen_at FROM seen"):
+            self._remember(url, seen_at)
+
+    def _remember(self, url: str, seen_at: float) -> None:
+        if self.bloom is not None:
+            self.bloom.add(url)
+        else:
+            self.urls[url] = seen_at
+
+    def __contains__(self, url: str) -> bool:
+        url = normalize_url(url)
+        if self.bloom is None:
+            return time.time() - self.urls.get(url, -math.inf) < self.expiry
+        if url not in self.bloom:
+            return False
+        with self.lock:
+            row = self.db.execute("SELECT seen_at FROM seen WHERE url = ?", (url,)).fetchone()
+        return row is not None and time.time() - row[0] < self.expiry
+
+    def add_many(self, urls: Iterable[str]) -> None:
+        """
+        Registra las URLs como vistas ahora
+        """
+        now = time.time()
+        normalized = [normalize_url(url) for url in urls]
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO seen (url, seen_at) VALUES (?, ?)", [(url, now) for url in normalized])
+        for url in normalized:
+            self._remember(url, now)
+
+    def record_estimates(self, rows: Iterable[Tuple[str, str, float, float, bool, Optional[float]]]) -> None:
+        """
+        Guarda la estimación de cada oferta estimada: (url, descripción, precio, estimación,
+        si viene del ensemble completo, segundos que costó por oferta)
+        """
+        now = time.time()
+        rows = [(normalize_url(url), *rest, now) for url, *rest in rows]
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO estimates (url, description, price, estimate, full, seconds, priced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows,
+            )
+
+    def estimates(self) -> List[Tuple[str, float, float, Optional[float]]]:
+        """
+        Devuelve (descripción, precio, estimación, segundos por oferta) de las ofertas estimadas con el ensemble completo
+        """
+        with self.lock:
+            return self.db.execute(
+                "SELECT description, price, estimate, seconds FROM estimates WHERE full = 1 ORDER BY priced_at"
+            ).fetchall()
+
@@ -0,0 +1,38 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+
+class perezoso:
+    """
+    Atributo que se construye la primera vez que se lee, como functools.cached_property,
+    pero seguro entre hilos: si dos hilos lo piden a la vez, uno lo construye y el otro espera.
+    Una vez construido queda en el __dict__ de la instancia y leerlo no tiene coste adicional.
+    """
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with self.lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.factory(instance)
+        return instance.__dict__[self.name]
+
+
+def warm_up(loaders: Iterable[Callable], max_workers: int = 8) -> None:
+    """
+    Ejecuta en paralelo las funciones de carga indicadas y espera a que terminen todas,
+    relanzando el primer error que se produzca
+    """
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="calentamiento") as executor:
+        for future in [executor.submit(loader) for loader in loaders]:
+            future.result()
@@ -0,0 +1,53 @@
+from typing import Optional, Self
+import numpy as np
+
+COLUMNS = ['Specialist', 'Frontier', 'RandomForest', 'Min', 'Max']
+
+
+class PredictorLineal:
+    """
+    Evalúa la regresión lineal del ensemble directamente con NumPy, sin construir un DataFrame
+    ni pasar por la validación de sklearn en cada predicción.
+    """
+
+    def __init__(self, coef: np.ndarray, intercept: float):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    @classmethod
+    def from_model(cls, model) -> Optional[Self]:
+        """
+        Extrae coeficientes e intercepto del modelo ajustado, ordenados según COLUMNS.
+        Devuelve None si el modelo no es lineal o si no reproduce las predicciones de sklearn.
+        """
+        if not hasattr(model, "coef_") or not hasattr(model, "intercept_"):
+            return None
+        coef = np.ravel(model.coef_)
+        names = list(getattr(model, "feature_names_in_", COLUMNS))
+        if sorted(names) != sorted(COLUMNS) or len(coef) != len(COLUMNS):
+            return None
+        predictor = cls(coef[[names.index(column) for column in COLUMNS]], np.ravel(model.intercept_)[0])
+        return predictor if predictor.matches(model) else None
+
+    def matches(self, model, rows: int = 64, tolerance: float = 1e-6) -> bool:
+        """
+        Comprueba que este predictor y el modelo de sklearn dan el mismo resultado sobre filas aleatorias
+        """
+        import pandas as pd
+        estimates = np.random.default_rng(0).uniform(1, 1000, size=(rows, 3))
+        X = features(estimates[:, 0], estimates[:, 1], estimates[:, 2])
+        # sklearn exige las columnas en el mismo orden que en el ajuste
+        names = list(getattr(model, "feature_names_in_", COLUMNS))
+        expected = model.predict(pd.DataFrame(X, columns=COLUMNS)[names])
+        return bool(np.allclose(self.predict(X), expected, rtol=tolerance, atol=tolerance))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return X @ self.coef + self.intercept
+
+
+def features(specialist, frontier, random_forest) -> np.ndarray:
+    """
+    Construye la matriz de entrada del ensemble: las tres estimaciones más su mínimo y su máximo
+    """
+    estimates = np.column_stack([specialist, frontier, random_forest]).astype(np.float64)
+    return np.column_stack([estimates, estimates.min(axis=1), estimates.max(axis=1)])
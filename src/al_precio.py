@@ -1,29 +1,18 @@
-import logging
-import queue
 import threading
-import time
 import gradio as gr
 from framework_agentes import DealAgentFramework
-from log_utils import reformat
+from bus_logs import get_bus
+from planificador import PlanificadorEjecuciones
 import plotly.graph_objects as go
-import chromadb
 
-client = chromadb.PersistentClient(path="products_vectorstore")
-print(client.list_collections())
-
-
-
-class QueueHandler(logging.Handler):
-    def __init__(self, log_queue):
-        super().__init__()
-        self.log_queue = log_queue
-
-    def emit(self, record):
-        self.log_queue.put(self.format(record))
+# Las líneas de log que llegan dentro de un mismo intervalo se envían juntas a la UI
+FRAME_INTERVAL = 0.1
+# Cada sesión guarda solo las líneas que se muestran
+HTML_LINES = 18
 
 
 def html_for(log_data):
-    output = '<br>'.join(log_data[-18:])
+    output = '<br>'.join(log_data[-HTML_LINES:])
     return f"""
     <div id="scrollContent" style="height: 400px; overflow-y: auto; border: 1px solid #ccc; background-color: #222229; padding: 10px;">
     {output}
@@ -31,27 +20,19 @@ def html_for(log_data):
     """
 
 
-def setup_logging(log_queue):
-    handler = QueueHandler(log_queue)
-    formatter = logging.Formatter(
-        "[%(asctime)s] %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S %z",
-    )
-    handler.setFormatter(formatter)
-    logger = logging.getLogger()
-    logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
-                
-
 class App:
 
     def __init__(self):    
         self.agent_framework = None
+        self.lock = threading.Lock()
+        # Todas las pestañas y temporizadores comparten las mismas ejecuciones
+        self.scheduler = PlanificadorEjecuciones(lambda: self.get_agent_framework().run())
 
     def get_agent_framework(self):
-        if not self.agent_framework:
-            self.agent_framework = DealAgentFramework()
-            self.agent_framework.init_agents_as_needed()
+        with self.lock:
+            if not self.agent_framework:
+                self.agent_framework = DealAgentFramework()
+                self.agent_framework.init_agents_as_needed()
         return self.agent_framework
 
     def run(self):
@@ -62,22 +43,14 @@ class App:
             def table_for(opps):
                 return [[opp.deal.product_description, f"${opp.deal.price:.2f}", f"${opp.estimate:.2f}", f"${opp.discount:.2f}", opp.deal.url] for opp in opps]
 
-            def update_output(log_data, log_queue, result_queue):
-                initial_result = table_for(self.get_agent_framework().memory)
-                final_result = None
+            def update_output(log_data, subscription, run):
+                initial_result = table_for(self.get_agent_framework().recent())
                 while True:
-                    try:
-                        message = log_queue.get_nowait()
-                        log_data.append(reformat(message))
-                        yield log_data, html_for(log_data), final_result or initial_result
-                    except queue.Empty:
-                        try:
-                            final_result = result_queue.get_nowait()
-                            yield log_data, html_for(log_data), final_result or initial_result
-                        except queue.Empty:
-                            if final_result is not None:
-                                break
-                            time.sleep(0.1)
+                    log_data = (log_data + subscription.next_frame(FRAME_INTERVAL))[-HTML_LINES:]
+                    succeeded = run.done() and run.exception() is None
+                    yield log_data, html_for(log_data), table_for(run.result()) if succeeded else initial_result
+                    if subscription.finished:
+                        break
 
             def get_initial_plot():
                 fig = go.Figure()
@@ -113,31 +86,19 @@ class App:
 
                 return fig
         
-            def do_run():
-                new_opportunities = self.get_agent_framework().run()
-                table = table_for(new_opportunities)
-                return table
-
             def run_with_logging(initial_log_data):
-                log_queue = queue.Queue()
-                result_queue = queue.Queue()
-                setup_logging(log_queue)
-                
-                def worker():
-                    result = do_run()
-                    result_queue.put(result)
-                
-                thread = threading.Thread(target=worker)
-                thread.start()
+                subscription = get_bus().subscribe()
+                run = self.scheduler.trigger()
+                run.add_done_callback(lambda _: subscription.finish())
                 
-                for log_data, output, final_result in update_output(initial_log_data, log_queue, result_queue):
+                for log_data, output, final_result in update_output(initial_log_data, subscription, run):
                     yield log_data, output, final_result
 
             def do_select(selected_index: gr.SelectData):
-                opportunities = self.get_agent_framework().memory
-                row = selected_index.index[0]
-                opportunity = opportunities[row]
-                self.get_agent_framework().planner.messenger.alert(opportunity)
+                # La tabla solo muestra una página del historial: la oportunidad se busca por su URL
+                opportunity = self.get_agent_framework().store.get(selected_index.row_value[4])
+                if opportunity:
+                    self.get_agent_framework().planner.messenger.alert(opportunity, force=True)
         
             with gr.Row():
                 gr.Markdown('<div style="text-align: center;font-size:24px"><strong>Al Precio</strong> - Framework autónomo de agentes en busca de ofertas en línea</div>')
@@ -156,11 +117,12 @@ class App:
                 with gr.Column(scale=1):
                     logs = gr.HTML()
                 with gr.Column(scale=1):
-                    plot = gr.Plot(value=get_plot(), show_label=False)
+                    plot = gr.Plot(value=get_initial_plot(), show_label=False)
         
             ui.load(run_with_logging, inputs=[log_data], outputs=[log_data, logs, opportunities_dataframe])
+            ui.load(get_plot, outputs=[plot])
 
-            timer = gr.Timer(value=300, active=True)
+            timer = gr.Timer(value=PlanificadorEjecuciones.INTERVAL, active=True)
             timer.tick(run_with_logging, inputs=[log_data], outputs=[log_data, logs, opportunities_dataframe])
 
             opportunities_dataframe.select(do_select)
@@ -0,0 +1,325 @@
+import argparse
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, List
+
+
+def timeit(fn: Callable, repeat: int) -> float:
+    """
+    Devuelve el tiempo medio en milisegundos de ejecutar fn
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def save_html_fixtures(folder: str) -> None:
+    """
+    Guarda en folder los resúmenes RSS y las páginas de ofertas actuales de los feeds
+    """
+    from agentes.deals import feeds, fetch_entries, download
+    os.makedirs(folder, exist_ok=True)
+    count = 0
+    for feed_url in feeds:
+        for entry in fetch_entries(feed_url):
+            with open(os.path.join(folder, f"resumen_{count}.html"), "w") as file:
+                file.write(entry['summary'])
+            with open(os.path.join(folder, f"pagina_{count}.html"), "wb") as file:
+                file.write(download(entry['links'][0]['href']))
+            count += 1
+    print(f"Guardados {count} resúmenes y páginas en {folder}")
+
+
+def bench_extraction(args) -> None:
+    """
+    Compara cada extractor HTML con el de referencia (BeautifulSoup) sobre los fixtures guardados
+    """
+    from agentes.extractores import EXTRACTORS, ExtractorBeautifulSoup
+    if args.download or not glob.glob(os.path.join(args.fixtures, "*.html")):
+        save_html_fixtures(args.fixtures)
+    summaries: List[str] = []
+    pages: List[bytes] = []
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "resumen_*.html"))):
+        with open(path) as file:
+            summaries.append(file.read())
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "pagina_*.html"))):
+        with open(path, "rb") as file:
+            pages.append(file.read())
+
+    reference = ExtractorBeautifulSoup()
+    expected_summaries = [reference.summary(s) for s in summaries]
+    expected_pages = [reference.content(p) for p in pages]
+    baseline = None
+    failed = []
+    for name, cls in EXTRACTORS.items():
+        try:
+            extractor = cls()
+            extractor.summary("<div></div>")
+        except Exception as e:
+            print(f"{name:>6}: no disponible ({e})")
+            continue
+        ms = timeit(lambda: [extractor.summary(s) for s in summaries] + [extractor.content(p) for p in pages], args.repeat)
+        baseline = baseline or ms
+        same_summaries = sum(extractor.summary(s) == e for s, e in zip(summaries, expected_summaries))
+        same_pages = sum(extractor.content(p) == e for p, e in zip(pages, expected_pages))
+        print(f"{name:>6}: {ms:8.1f} ms por pasada ({baseline / ms:4.1f}x) - "
+              f"resúmenes iguales {same_summaries}/{len(summaries)}, páginas iguales {same_pages}/{len(pages)}")
+        if same_summaries < len(summaries) or same_pages < len(pages):
+            failed.append(name)
+    if failed:
+        sys.exit(f"Extractores que no coinciden con BeautifulSoup: {', '.join(failed)}")
+
+
+def bench_embeddings(args) -> None:
+    """
+    Compara cada backend de embeddings con PyTorch sobre documentos de la colección 'products':
+    paridad (similitud coseno mínima frente a torch, que debe ser >= 0.99) y rendimiento
+    """
+    import chromadb
+    import numpy as np
+    from agentes.embeddings import BACKENDS, ServicioEmbeddings, load_model
+    collection = chromadb.PersistentClient(path=args.db).get_or_create_collection('products')
+    result = collection.get(include=['documents', 'embeddings'], limit=args.samples)
+    documents = result['documents']
+    stored = np.array(result['embeddings'], dtype=np.float32)
+
+    def normalize(vectors):
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    reference = None
+    failed = []
+    for backend in BACKENDS:
+        try:
+            model = load_model(ServicioEmbeddings.MODEL, backend)
+        except Exception as e:
+            print(f"{backend:>10}: no disponible ({e})")
+            continue
+        vectors = model.encode(documents, batch_size=args.batch_size)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            vectors = model.encode(documents, batch_size=args.batch_size)
+        per_second = len(documents) * args.repeat / (time.perf_counter() - start)
+        vectors = normalize(np.asarray(vectors, dtype=np.float32))
+        if reference is None:
+            reference = vectors
+        parity = float(np.min(np.sum(vectors * reference, axis=1)))
+        chroma = float(np.min(np.sum(vectors * normalize(stored), axis=1)))
+        status = "OK" if parity >= 0.99 else "FALLA"
+        print(f"{backend:>10}: {per_second:8.1f} textos/s - coseno mínimo frente a torch {parity:.4f} [{status}], "
+              f"frente a Chroma {chroma:.4f}")
+        if parity < 0.99:
+            failed.append(backend)
+    if failed:
+        sys.exit(f"Backends por debajo de la similitud coseno mínima de 0.99: {', '.join(failed)}")
+
+
+def bench_ensemble(args) -> None:
+    """
+    Compara la predicción del ensemble con sklearn (DataFrame de una fila) y con el camino rápido de NumPy
+    """
+    import joblib
+    import numpy as np
+    import pandas as pd
+    from agentes.predictor_lineal import COLUMNS, PredictorLineal, features
+    model = joblib.load(args.model)
+    fast = PredictorLineal.from_model(model)
+    if fast is None:
+        print("El modelo no es lineal o no coincide con NumPy: no hay camino rápido")
+        return
+    estimates = np.random.default_rng(42).uniform(1, 1000, size=(args.rows, 3))
+    X = features(estimates[:, 0], estimates[:, 1], estimates[:, 2])
+    difference = np.max(np.abs(fast.predict(X) - model.predict(pd.DataFrame(X, columns=COLUMNS))))
+    print(f"Diferencia máxima frente a sklearn en {args.rows} filas: {difference:.2e}")
+
+    def sklearn_single():
+        s, f, r = estimates[0]
+        model.predict(pd.DataFrame({
+            'Specialist': [s], 'Frontier': [f], 'RandomForest': [r], 'Min': [min(s, f, r)], 'Max': [max(s, f, r)],
+        }))
+
+    def numpy_single():
+        fast.predict(features(*estimates[0]))
+
+    single_sklearn = timeit(sklearn_single, args.repeat)
+    single_numpy = timeit(numpy_single, args.repeat)
+    batch_sklearn = timeit(lambda: model.predict(pd.DataFrame(X, columns=COLUMNS)), args.repeat)
+    batch_numpy = timeit(lambda: fast.predict(X), args.repeat)
+    print(f"Una fila:    sklearn {single_sklearn * 1000:8.1f} µs - numpy {single_numpy * 1000:8.1f} µs ({single_sklearn / single_numpy:5.1f}x)")
+    print(f"{args.rows} filas: sklearn {batch_sklearn * 1000:8.1f} µs - numpy {batch_numpy * 1000:8.1f} µs ({batch_sklearn / batch_numpy:5.1f}x)")
+
+
+def bench_forest(args) -> None:
+    """
+    Compara el Random Forest de sklearn con el bosque compacto: carga, concordancia y predicción
+    """
+    import joblib
+    import numpy as np
+    from agentes.bosque_compacto import BosqueCompacto, convert
+    start = time.perf_counter()
+    model = joblib.load(args.model)
+    load_sklearn = (time.perf_counter() - start) * 1000
+    if not os.path.exists(args.compact):
+        convert(args.model, args.compact)
+    start = time.perf_counter()
+    forest = BosqueCompacto.load(args.compact)
+    load_compact = (time.perf_counter() - start) * 1000
+    print(f"Carga: joblib {load_sklearn:8.1f} ms - compacto {load_compact:8.1f} ms")
+
+    X = np.random.default_rng(42).normal(0, 0.05, size=(args.rows, forest.n_features))
+    difference = np.max(np.abs(forest.predict(X) - model.predict(X)))
+    print(f"Diferencia máxima frente a sklearn en {args.rows} filas: {difference:.2e}")
+    for rows in (1, args.rows):
+        sklearn_ms = timeit(lambda: model.predict(X[:rows]), args.repeat)
+        compact_ms = timeit(lambda: forest.predict(X[:rows]), args.repeat)
+        print(f"{rows:>5} filas: sklearn {sklearn_ms:8.2f} ms - compacto {compact_ms:8.2f} ms ({sklearn_ms / compact_ms:5.1f}x)")
+
+
+def bench_cascade(args) -> None:
+    """
+    Evalúa la cascada del ensemble sin conexión sobre todas las ofertas estimadas con el ensemble completo,
+    hayan generado alerta o no; su estimación y su coste por oferta se guardan en el índice de vistas.
+    Para cada margen informa de cuántas ofertas se escalan, del tiempo y los tokens ahorrados
+    y de lo que se pierde en precisión frente al ensemble completo.
+    """
+    import chromadb
+    import numpy as np
+    from agentes.agente_ensamblador import AgenteEnsamblador, BandasCascada
+    from agentes.agente_planeador import AgentePlaneador
+    from agentes.deals import Deal
+    from agentes.indice_vistos import IndiceVistos
+    rows = IndiceVistos(args.memory).estimates()
+    if not rows:
+        print(f"No hay ofertas estimadas con el ensemble completo en {args.memory}")
+        return
+    descriptions = [description for description, _, _, _ in rows]
+    prices = np.array([price for _, price, _, _ in rows])
+    full = np.array([estimate for _, _, estimate, _ in rows])
+    tokens = np.array([AgentePlaneador.tokens_for(Deal(product_description=d, price=0, url="")) for d in descriptions])
+    threshold = AgentePlaneador.DEAL_THRESHOLD
+    collection = chromadb.PersistentClient(path=args.db).get_or_create_collection('products')
+    ensemble = AgenteEnsamblador(collection)
+    start = time.perf_counter()
+    random_forest, neighbours = ensemble.cheap_estimates(descriptions)
+    cheap_s = (time.perf_counter() - start) / len(rows)
+    if args.measure:
+        sample = descriptions[:args.measure]
+        start = time.perf_counter()
+        ensemble.price_batch(sample)
+        full_s = (time.perf_counter() - start) / len(sample)
+        source = f"medido ahora sobre {len(sample)} ofertas"
+    else:
+        measured = [seconds for _, _, _, seconds in rows if seconds is not None]
+        full_s = statistics.median(measured) if measured else float("nan")
+        source = f"mediana de {len(measured)} ejecuciones registradas"
+    full_alerts = full - prices > threshold
+    print(f"{len(rows)} ofertas ({full_alerts.sum()} con alerta) - estimación barata {cheap_s * 1000:.1f} ms por oferta - "
+          f"ensemble completo {full_s:.2f} s por oferta ({source})")
+    for margin in args.margins:
+        bands = BandasCascada(margin, args.relative, args.disagreement)
+        escalate = bands.escalate(random_forest, neighbours, prices, threshold)
+        cascade = np.where(escalate, full, random_forest)
+        alerts = cascade - prices > threshold
+        saved_s = (~escalate).sum() * full_s - len(rows) * cheap_s
+        print(
+            f"margen ${margin:6.1f}: escala {escalate.mean():6.1%} - "
+            f"ahorra {saved_s:7.1f} s y {tokens[~escalate].sum():7d} tokens - "
+            f"error medio ${np.mean(np.abs(cascade - full)):7.2f} - "
+            f"alertas perdidas {np.sum(full_alerts & ~alerts)}/{full_alerts.sum()} - "
+            f"alertas nuevas {np.sum(alerts & ~full_alerts)}/{(~full_alerts).sum()}"
+        )
+
+
+STARTUP_STAGES = {
+    "import framework_agentes": "import framework_agentes",
+    "framework listo (perezoso)": (
+        "from framework_agentes import DealAgentFramework\n"
+        "DealAgentFramework.WARM_UP = False\n"
+        "DealAgentFramework().init_agents_as_needed()"
+    ),
+    "framework listo + precarga": (
+        "from framework_agentes import DealAgentFramework\n"
+        "DealAgentFramework.WARM_UP = False\n"
+        "framework = DealAgentFramework()\n"
+        "framework.init_agents_as_needed()\n"
+        "framework.planner.warm_up()"
+    ),
+    "import al_precio": "import al_precio",
+}
+
+
+def bench_startup(args) -> None:
+    """
+    Mide, en procesos nuevos, cuánto se tarda desde lanzar python hasta cada etapa del arranque
+    """
+    stages = dict(STARTUP_STAGES)
+    if args.first_run:
+        stages["primera ejecución"] = "from framework_agentes import DealAgentFramework\nDealAgentFramework().run()"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, ["src", os.getenv("PYTHONPATH")])))
+    for name, code in stages.items():
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+            times.append(time.perf_counter() - start)
+            if result.returncode != 0:
+                print(f"{name:>28}: error\n{result.stderr.strip().splitlines()[-1]}")
+                break
+        else:
+            print(f"{name:>28}: mediana {statistics.median(times):6.2f} s - mínimo {min(times):6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de AlPrecio")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    extraction = commands.add_parser("extraccion", help="Extractores HTML sobre páginas de dealnews guardadas")
+    extraction.add_argument("--fixtures", default="tests/fixtures_html", help="Carpeta con resumen_*.html y pagina_*.html")
+    extraction.add_argument("--download", action="store_true", help="Descarga de nuevo los fixtures desde los feeds")
+    extraction.add_argument("--repeat", type=int, default=5)
+    extraction.set_defaults(run=bench_extraction)
+
+    embeddings = commands.add_parser("embeddings", help="Paridad y rendimiento de los backends de embeddings")
+    embeddings.add_argument("--db", default=os.getenv("CHROMA_PATH", "products_vectorstore"))
+    embeddings.add_argument("--samples", type=int, default=500)
+    embeddings.add_argument("--batch-size", type=int, default=32)
+    embeddings.add_argument("--repeat", type=int, default=3)
+    embeddings.set_defaults(run=bench_embeddings)
+
+    ensemble = commands.add_parser("ensemble", help="Predicción del ensemble con sklearn frente a NumPy")
+    ensemble.add_argument("--model", default="src/ensemble_model.pkl")
+    ensemble.add_argument("--rows", type=int, default=1000)
+    ensemble.add_argument("--repeat", type=int, default=1000)
+    ensemble.set_defaults(run=bench_ensemble)
+
+    forest = commands.add_parser("bosque", help="Random Forest de sklearn frente al bosque compacto")
+    forest.add_argument("--model", default="src/random_forest_model.pkl")
+    forest.add_argument("--compact", default="src/random_forest_compacto")
+    forest.add_argument("--rows", type=int, default=64)
+    forest.add_argument("--repeat", type=int, default=20)
+    forest.set_defaults(run=bench_forest)
+
+    cascade = commands.add_parser("cascada", help="Ahorro y precisión de la cascada del ensemble sobre las ofertas ya estimadas")
+    cascade.add_argument("--memory", default=os.getenv("MEMORY_DB", "memory.sqlite"))
+    cascade.add_argument("--db", default=os.getenv("CHROMA_PATH", "products_vectorstore"))
+    cascade.add_argument("--margins", type=float, nargs="+", default=[10.0, 30.0, 60.0])
+    cascade.add_argument("--relative", type=float, default=float(os.getenv("CASCADE_RELATIVE", "0.2")))
+    cascade.add_argument("--disagreement", type=float, default=float(os.getenv("CASCADE_DISAGREEMENT", "0.4")))
+    cascade.add_argument("--measure", type=int, default=0, help="Mide ahora el ensemble completo sobre N ofertas (requiere red y claves)")
+    cascade.set_defaults(run=bench_cascade)
+
+    startup = commands.add_parser("arranque", help="Tiempo de arranque de framework_agentes.py y al_precio.py")
+    startup.add_argument("--repeat", type=int, default=3)
+    startup.add_argument("--first-run", action="store_true", help="Incluye una ejecución completa (requiere red y claves)")
+    startup.set_defaults(run=bench_startup)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import logging
+import threading
+from collections import deque
+from itertools import islice
+from typing import List, Optional
+from log_utils import reformat
+
+
+class BusLogs(logging.Handler):
+    """
+    Handler único del logger raíz que comparten todas las sesiones de la UI.
+    Cada registro se formatea y se convierte a HTML una sola vez y se guarda en un buffer
+    circular de tamaño fijo. Las sesiones no tienen cola propia: solo recuerdan hasta qué
+    línea han leído, así que ni la memoria ni el coste de cada log crecen con el número de
+    sesiones o con el tiempo que lleve la aplicación en marcha.
+    """
+
+    CAPACITY = 500
+
+    def __init__(self, capacity: int = CAPACITY):
+        super().__init__()
+        self.lines = deque(maxlen=capacity)
+        self.sequence = 0
+        self.condition = threading.Condition()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = reformat(self.format(record))
+        except Exception:
+            self.handleError(record)
+            return
+        with self.condition:
+            self.lines.append(line)
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def subscribe(self) -> "Suscripcion":
+        """
+        Devuelve una suscripción que recibirá las líneas publicadas a partir de ahora
+        """
+        with self.condition:
+            return Suscripcion(self, self.sequence)
+
+    def since(self, position: int) -> List[str]:
+        """
+        Devuelve las líneas publicadas después de la posición indicada que siguen en el buffer.
+        Debe llamarse con la condición adquirida.
+        """
+        available = min(self.sequence - position, len(self.lines))
+        return list(islice(self.lines, len(self.lines) - available, None))
+
+
+class Suscripcion:
+    """
+    Lector de una sesión sobre el bus: espera a que haya líneas nuevas y las agrupa por fotograma
+    """
+
+    def __init__(self, bus: BusLogs, position: int):
+        self.bus = bus
+        self.position = position
+        self.finished = False
+
+    def next_frame(self, interval: float) -> List[str]:
+        """
+        Bloquea hasta que se publica alguna línea o la suscripción se cierra, y después sigue
+        recogiendo durante un fotograma de interval segundos para enviarlas todas juntas
+        """
+        with self.bus.condition:
+            self.bus.condition.wait_for(lambda: self.bus.sequence > self.position or self.finished)
+            self.bus.condition.wait_for(lambda: self.finished, timeout=interval)
+            lines = self.bus.since(self.position)
+            self.position = self.bus.sequence
+        return lines
+
+    def finish(self) -> None:
+        """
+        Cierra la suscripción y despierta al lector para que entregue lo que quede pendiente
+        """
+        with self.bus.condition:
+            self.finished = True
+            self.bus.condition.notify_all()
+
+
+_bus: Optional[BusLogs] = None
+_lock = threading.Lock()
+
+
+def get_bus() -> BusLogs:
+    """
+    Devuelve el bus de logs, instalándolo en el logger raíz la primera vez
+    """
+    global _bus
+    with _lock:
+        if _bus is None:
+            _bus = BusLogs()
+            _bus.setFormatter(logging.Formatter(
+                "[%(asctime)s] %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S %z",
+            ))
+            logger = logging.getLogger()
+            logger.addHandler(_bus)
+            logger.setLevel(logging.INFO)
+        return _bus
@@ -1,14 +1,19 @@
+import argparse
 import os
 import sys
+import asyncio
+import threading
 import logging
-import json
 from typing import List
 from dotenv import load_dotenv
 import chromadb
 from agentes.agente_planeador import AgentePlaneador
 from agentes.deals import Opportunity
-from sklearn.manifold import TSNE
-import numpy as np
+from agentes.cache_respuestas import get_cache
+from agentes.indice_vistos import IndiceVistos
+from proyeccion_vectores import get_projection
+from memoria import MemoriaOportunidades
+from planificador import PlanificadorEjecuciones
 
 load_dotenv()
 
@@ -38,33 +43,49 @@ class DealAgentFramework:
 
     DB = os.getenv("CHROMA_PATH", "products_vectorstore")
     MEMORY_FILENAME = "memory.json"
+    MEMORY_DB = os.getenv("MEMORY_DB", "memory.sqlite")
+    ASYNC_PLANNER = os.getenv("ASYNC_PLANNER", "1") != "0"
+    WARM_UP = os.getenv("WARM_UP", "1") != "0"
+    # Oportunidades que se muestran en la tabla de la UI: las más recientes, sin cargar todo el historial
+    TABLE_ROWS = 100
 
     def __init__(self):
         init_logging()
         load_dotenv()
         client = chromadb.PersistentClient(path=self.DB)
-        self.memory = self.read_memory()
+        self.store = MemoriaOportunidades(self.MEMORY_DB)
+        self.seen = IndiceVistos(self.MEMORY_DB, use_bloom=os.getenv("SEEN_BLOOM", "0") == "1")
+        self.migrate_memory()
         self.collection = client.get_or_create_collection('products')
         self.planner = None
 
     def init_agents_as_needed(self):
         if not self.planner:
             self.log("Inicializando el framework de agentes")
-            self.planner = AgentePlaneador(self.collection)
+            self.planner = AgentePlaneador(self.collection, seen=self.seen)
+            if self.WARM_UP:
+                threading.Thread(target=self.warm_up, name="calentamiento", daemon=True).start()
             self.log("El framework de agentes está listo")
+
+    def warm_up(self):
+        """
+        Precarga los agentes en segundo plano; si algo falla se volverá a intentar al usarlo
+        """
+        try:
+            self.planner.warm_up()
+        except Exception as e:
+            self.log(f"La precarga de agentes ha fallado: {e}")
         
-    def read_memory(self) -> List[Opportunity]:
-        if os.path.exists(self.MEMORY_FILENAME):
-            with open(self.MEMORY_FILENAME, "r") as file:
-                data = json.load(file)
-            opportunities = [Opportunity(**item) for item in data]
-            return opportunities
-        return []
-
-    def write_memory(self) -> None:
-        data = [opportunity.dict() for opportunity in self.memory]
-        with open(self.MEMORY_FILENAME, "w") as file:
-            json.dump(data, file, indent=2)
+    def migrate_memory(self) -> None:
+        migrated = self.store.migrate_json(self.MEMORY_FILENAME)
+        if migrated:
+            self.log(f"Se migraron {migrated} oportunidades de {self.MEMORY_FILENAME} a {self.MEMORY_DB}")
+
+    def recent(self) -> List[Opportunity]:
+        return self.store.recent(self.TABLE_ROWS)
+
+    def write_memory(self, opportunity: Opportunity) -> None:
+        self.store.add(opportunity)
 
     def log(self, message: str):
         text = BG_BLUE + WHITE + "[Framework de Agentes] " + message + RESET
@@ -73,26 +94,36 @@ class DealAgentFramework:
     def run(self) -> List[Opportunity]:
         self.init_agents_as_needed()
         logging.info("Iniciando el Agente de Planificación")
-        result = self.planner.plan(memory=self.memory)
+        if self.ASYNC_PLANNER:
+            result = asyncio.run(self.planner.plan_async(memory=self.store))
+        else:
+            result = self.planner.plan(memory=self.store)
         logging.info(f"El Agente de Planificación ha terminado y ha devuelto: {result}")
+        stats = get_cache().stats()
+        self.log(f"Caché de respuestas LLM: {stats['hits']} aciertos, {stats['misses']} fallos ({stats['hit_rate']:.0%})")
         if result:
-            self.memory.append(result)
-            self.write_memory()
-        return self.memory
+            self.write_memory(result)
+        return self.recent()
+
+    @staticmethod
+    def colors_for(metadatas) -> List[str]:
+        categories = [metadata['category'] for metadata in metadatas]
+        return [COLORS[CATEGORIES.index(c)] for c in categories]
 
     @classmethod
     def get_plot_data(cls, max_datapoints=10000):
         client = chromadb.PersistentClient(path=cls.DB)
         collection = client.get_or_create_collection('products')
-        result = collection.get(include=['embeddings', 'documents', 'metadatas'], limit=max_datapoints)
-        vectors = np.array(result['embeddings'])
-        documents = result['documents']
-        categories = [metadata['category'] for metadata in result['metadatas']]
-        colors = [COLORS[CATEGORIES.index(c)] for c in categories]
-        tsne = TSNE(n_components=3, random_state=42, n_jobs=-1)
-        reduced_vectors = tsne.fit_transform(vectors)
-        return documents, reduced_vectors, colors
+        return get_projection(collection, cls.colors_for, max_datapoints)
 
 
 if __name__=="__main__":
-    DealAgentFramework().run()
+    parser = argparse.ArgumentParser(description="Framework de agentes de Al Precio")
+    parser.add_argument("--daemon", action="store_true", help="ejecuta el ciclo periódicamente sin interfaz")
+    parser.add_argument("--interval", type=float, default=PlanificadorEjecuciones.INTERVAL, help="segundos entre ejecuciones en modo demonio")
+    args = parser.parse_args()
+    framework = DealAgentFramework()
+    if args.daemon:
+        PlanificadorEjecuciones(framework.run).serve(args.interval)
+    else:
+        framework.run()
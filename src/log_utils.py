@@ -26,10 +26,15 @@ mapper = {
 }
 
 
+# Las etiquetas HTML se construyen una sola vez, no en cada mensaje
+replacements = [(key, f'<span style="color: {value}">') for key, value in mapper.items()] + [(RESET, '</span>')]
+
+
 def reformat(message):
-    for key, value in mapper.items():
-        message = message.replace(key, f'<span style="color: {value}">')
-    message = message.replace(RESET, '</span>')
+    if '\033' not in message:
+        return message
+    for key, value in replacements:
+        message = message.replace(key, value)
     return message
     
     
\ No newline at end of file
@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+from agentes.deals import Opportunity
+
+
+class MemoriaOportunidades:
+    """
+    Almacén de las oportunidades encontradas en SQLite (modo WAL).
+    Cada oportunidad se añade con una inserción atómica en lugar de reescribir todo el
+    historial, y la URL de la oferta está indexada para consultas directas.
+    """
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS opportunities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL UNIQUE,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+        self.db.commit()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM opportunities").fetchone()[0]
+
+    def __contains__(self, url: str) -> bool:
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM opportunities WHERE url = ?", (url,)).fetchone() is not None
+
+    def add_all(self, opportunities: List[Opportunity]) -> None:
+        """
+        Añade las oportunidades en una sola transacción; las URLs ya guardadas se ignoran
+        """
+        now = time.time()
+        rows = [(opp.deal.url, opp.model_dump_json(), now) for opp in opportunities]
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR IGNORE INTO opportunities (url, data, created_at) VALUES (?, ?, ?)", rows)
+
+    def add(self, opportunity: Opportunity) -> None:
+        self.add_all([opportunity])
+
+    def get(self, url: str) -> Optional[Opportunity]:
+        """
+        Devuelve la oportunidad de la URL indicada, si existe
+        """
+        with self.lock:
+            row = self.db.execute("SELECT data FROM opportunities WHERE url = ?", (url,)).fetchone()
+        return Opportunity.model_validate_json(row[0]) if row else None
+
+    def recent(self, limit: int) -> List[Opportunity]:
+        """
+        Devuelve las últimas limit oportunidades en el orden en que se encontraron, sin leer el resto del historial
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT data FROM (SELECT id, data FROM opportunities ORDER BY id DESC LIMIT ?) ORDER BY id", (limit,)
+            ).fetchall()
+        return [Opportunity.model_validate_json(data) for (data,) in rows]
+
+    def all(self) -> List[Opportunity]:
+        """
+        Devuelve todas las oportunidades en el orden en que se encontraron
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT data FROM opportunities ORDER BY id").fetchall()
+        return [Opportunity.model_validate_json(data) for (data,) in rows]
+
+    def migrate_json(self, filename: str) -> int:
+        """
+        Importa el memory.json del formato anterior y lo renombra a .migrated para no importarlo dos veces
+        :return: el número de oportunidades importadas
+        """
+        if not os.path.exists(filename):
+            return 0
+        with open(filename, "r") as file:
+            data = json.load(file)
+        self.add_all([Opportunity(**item) for item in data])
+        os.replace(filename, filename + ".migrated")
+        return len(data)
@@ -0,0 +1,71 @@
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+
+class PlanificadorEjecuciones:
+    """
+    Dueño único del ciclo de ejecución del framework de agentes.
+    Nunca hay dos ejecuciones a la vez: quien la pide mientras hay una en curso recibe esa misma,
+    y quien la pide poco después de que termine (menos de min_interval segundos) recibe su resultado
+    sin repetir el trabajo. Todos los que la pidieron comparten el mismo Future.
+    """
+
+    INTERVAL = float(os.getenv("RUN_INTERVAL", "300"))
+    MIN_INTERVAL = float(os.getenv("RUN_MIN_INTERVAL", "240"))
+
+    def __init__(self, run: Callable, min_interval: float = MIN_INTERVAL):
+        self.run = run
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.current: Optional[Future] = None
+        self.finished_at = -math.inf
+
+    def trigger(self, force: bool = False) -> Future:
+        """
+        Pide una ejecución y devuelve el Future de la que atenderá la petición.
+        Con force solo se reutiliza la ejecución en curso, nunca un resultado anterior.
+        """
+        with self.lock:
+            current = self.current
+            if current is not None:
+                if not current.done():
+                    return current
+                if not force and time.monotonic() - self.finished_at < self.min_interval:
+                    return current
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self.current = future
+        threading.Thread(target=self._execute, args=(future,), name="ejecucion", daemon=True).start()
+        return future
+
+    def _execute(self, future: Future) -> None:
+        try:
+            result = self.run()
+        except Exception as e:
+            logging.exception("La ejecución del framework de agentes ha fallado")
+            with self.lock:
+                # Tras un fallo se permite reintentar en la siguiente petición
+                self.finished_at = -math.inf
+            future.set_exception(e)
+        else:
+            with self.lock:
+                self.finished_at = time.monotonic()
+            future.set_result(result)
+
+    def serve(self, interval: float = INTERVAL, stop: Optional[threading.Event] = None) -> None:
+        """
+        Modo demonio sin interfaz: ejecuta el ciclo cada interval segundos hasta que se active stop
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.trigger(force=True).result()
+            except Exception:
+                pass
+            logging.info(f"Próxima ejecución en {interval:.0f} segundos")
+            stop.wait(interval)
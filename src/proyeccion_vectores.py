@@ -0,0 +1,70 @@
+import hashlib
+import os
+from typing import List, Tuple
+import numpy as np
+
+CACHE_DIR = os.getenv("PLOT_CACHE_DIR", "plot_cache")
+METHOD = os.getenv("PLOT_PROJECTION", "tsne")
+
+
+def collection_key(ids: List[str]) -> str:
+    """
+    Identifica el contenido de la colección por su número de elementos y el hash de sus ids
+    """
+    digest = hashlib.sha1('\0'.join(ids).encode()).hexdigest()[:16]
+    return f"{len(ids)}_{digest}"
+
+
+def fit_pca(vectors: np.ndarray, path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ajusta una PCA de 3 componentes y la guarda para proyectar después los puntos nuevos
+    """
+    mean = vectors.mean(axis=0)
+    _, _, components = np.linalg.svd(vectors - mean, full_matrices=False)
+    components = components[:3]
+    np.savez(path, mean=mean, components=components)
+    return mean, components
+
+
+def project(vectors: np.ndarray, method: str, pca_path: str) -> np.ndarray:
+    """
+    Reduce los vectores a 3 dimensiones.
+    tsne: TSNE completo, de calidad pero lento.
+    pca: PCA ajustada una sola vez; los puntos nuevos solo se transforman con la proyección guardada.
+    """
+    if method == "pca":
+        if os.path.exists(pca_path):
+            fitted = np.load(pca_path)
+            mean, components = fitted["mean"], fitted["components"]
+        else:
+            mean, components = fit_pca(vectors, pca_path)
+        return (vectors - mean) @ components.T
+    from sklearn.manifold import TSNE
+    tsne = TSNE(n_components=3, random_state=42, n_jobs=-1)
+    return tsne.fit_transform(vectors)
+
+
+def get_projection(collection, colors_for, max_datapoints: int, method: str = METHOD) -> Tuple[List[str], np.ndarray, List[str]]:
+    """
+    Devuelve documentos, vectores proyectados en 3D y colores de los productos de la colección.
+    La proyección se guarda en disco junto con documentos y colores, indexada por el contenido
+    de la colección, así que mientras no cambie solo se leen los ids de Chroma.
+    :param collection: la colección 'products' de Chroma
+    :param colors_for: función que convierte la lista de metadatos en la lista de colores
+    :param max_datapoints: número máximo de productos a representar
+    :param method: 'tsne' o 'pca'
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    ids = collection.get(include=[], limit=max_datapoints)['ids']
+    path = os.path.join(CACHE_DIR, f"{method}_{collection_key(ids)}.npz")
+    if os.path.exists(path):
+        cached = np.load(path)
+        return cached["documents"].tolist(), cached["vectors"], cached["colors"].tolist()
+
+    result = collection.get(include=['embeddings', 'documents', 'metadatas'], limit=max_datapoints)
+    vectors = np.array(result['embeddings'])
+    documents = result['documents']
+    colors = colors_for(result['metadatas'])
+    reduced_vectors = project(vectors, method, os.path.join(CACHE_DIR, "pca.npz"))
+    np.savez(path, documents=np.array(documents), vectors=reduced_vectors, colors=np.array(colors))
+    return documents, reduced_vectors, colors
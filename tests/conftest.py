@@ -0,0 +1,59 @@
+import os
+import sys
+
+# El código se ejecuta como `python src/...`, así que los módulos se importan desde src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+
+
+class ManejadorLocal(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = SimpleNamespace(method=self.command, path=self.path, headers=self.headers, body=body, port=self.client_address[1])
+        self.server.requests.append(request)
+        status, headers, content = self.server.respond(request)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorLocal(ThreadingHTTPServer):
+    """
+    Servidor HTTP local que sustituye a los servicios externos en los tests: guarda las peticiones
+    recibidas y responde lo que devuelva respond(request) como (estado, cabeceras, cuerpo)
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ManejadorLocal)
+        self.requests = []
+        self.respond = lambda request: (200, {}, b"")
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+@pytest.fixture
+def servidor():
+    server = ServidorLocal()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,103 @@
+import json
+import threading
+from agentes.alertas import Canal, CanalArchivo, CanalWebhook, CuboTokens, DespachadorAlertas
+from agentes.deals import Deal, Opportunity
+
+
+class CanalMemoria(Canal):
+    """
+    Canal de prueba que guarda los textos enviados
+    """
+
+    name = "memoria"
+
+    def __init__(self, rate=None, burst=1):
+        self.RATE, self.BURST = rate, burst
+        super().__init__()
+        self.sent = []
+        self.event = threading.Event()
+
+    def send(self, text, opportunity):
+        self.sent.append(text)
+        self.event.set()
+
+
+def opportunity(url: str) -> Opportunity:
+    deal = Deal(product_description="Auriculares inalámbricos", price=99.0, url=url)
+    return Opportunity(deal=deal, estimate=199.0, discount=100.0)
+
+
+def drain(dispatcher: DespachadorAlertas) -> None:
+    dispatcher.executor.shutdown(wait=True)
+
+
+def test_token_bucket_drops_beyond_burst():
+    bucket = CuboTokens(rate=0.001, burst=2)
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+    bucket.updated -= 2000
+    assert bucket.try_acquire()
+
+
+def test_duplicate_url_is_alerted_once():
+    channel = CanalMemoria()
+    dispatcher = DespachadorAlertas([channel])
+    assert dispatcher.dispatch("a", opportunity("https://www.dealnews.com/x?utm_source=rss")) == {"memoria": True}
+    assert dispatcher.dispatch("b", opportunity("https://www.dealnews.com/x?iref=feed")) == {"memoria": False}
+    assert dispatcher.dispatch("c", opportunity("https://www.dealnews.com/x"), force=True) == {"memoria": True}
+    drain(dispatcher)
+    assert sorted(channel.sent) == ["a", "c"]
+
+
+def test_rate_limited_channel_drops_without_blocking_others():
+    limited, free = CanalMemoria(rate=0.001, burst=1), CanalMemoria()
+    limited.name = "limitado"
+    dispatcher = DespachadorAlertas([limited, free])
+    assert dispatcher.dispatch("a", opportunity("https://example.com/1")) == {"limitado": True, "memoria": True}
+    assert dispatcher.dispatch("b", opportunity("https://example.com/2")) == {"limitado": False, "memoria": True}
+    drain(dispatcher)
+    assert limited.sent == ["a"]
+    assert sorted(free.sent) == ["a", "b"]
+
+
+def test_url_is_remembered_only_if_a_channel_accepted():
+    channel = CanalMemoria(rate=0.001, burst=1)
+    dispatcher = DespachadorAlertas([channel])
+    dispatcher.dispatch("a", opportunity("https://example.com/1"))
+    assert dispatcher.dispatch("b", opportunity("https://example.com/2")) == {"memoria": False}
+    channel.bucket.updated -= 2000
+    assert dispatcher.dispatch("b", opportunity("https://example.com/2")) == {"memoria": True}
+    drain(dispatcher)
+    assert channel.sent == ["a", "b"]
+
+
+def test_failing_channel_does_not_affect_others():
+    class CanalRoto(CanalMemoria):
+        name = "roto"
+
+        def send(self, text, opportunity):
+            raise ConnectionError("caído")
+
+    working = CanalMemoria()
+    dispatcher = DespachadorAlertas([CanalRoto(), working])
+    assert dispatcher.dispatch("a", opportunity("https://example.com/1")) == {"roto": True, "memoria": True}
+    assert working.event.wait(5)
+
+
+def test_webhook_posts_the_opportunity(servidor):
+    dispatcher = DespachadorAlertas([CanalWebhook(servidor.url + "/hook")])
+    dispatcher.dispatch("texto", opportunity("https://example.com/1"))
+    drain(dispatcher)
+    payload = json.loads(servidor.requests[0].body)
+    assert servidor.requests[0].method == "POST"
+    assert payload["text"] == "texto"
+    assert payload["opportunity"]["deal"]["url"] == "https://example.com/1"
+
+
+def test_file_sink_appends_json_lines(tmp_path):
+    path = tmp_path / "alerts.jsonl"
+    dispatcher = DespachadorAlertas([CanalArchivo(str(path))])
+    dispatcher.dispatch("a", opportunity("https://example.com/1"))
+    dispatcher.dispatch("b", opportunity("https://example.com/2"))
+    drain(dispatcher)
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert sorted(line["text"] for line in lines) == ["a", "b"]
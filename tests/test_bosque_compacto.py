@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+from agentes.bosque_compacto import BosqueCompacto
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    X = rng.normal(0, 0.1, size=(500, 16))
+    y = 100 * X[:, 0] - 50 * X[:, 3] + 20 * X[:, 7] ** 2 + rng.normal(0, 1, size=len(X))
+    return ensemble.RandomForestRegressor(n_estimators=20, max_depth=12, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def sample():
+    return np.random.default_rng(1).normal(0, 0.1, size=(256, 16))
+
+
+def test_matches_sklearn(model, sample):
+    forest = BosqueCompacto.from_sklearn(model)
+    np.testing.assert_allclose(forest.predict(sample), model.predict(sample), rtol=0, atol=1e-9)
+    assert forest.predict(sample[0]) == pytest.approx(model.predict(sample[:1]))
+
+
+def test_matches_sklearn_after_save_and_mmap_load(model, sample, tmp_path):
+    BosqueCompacto.from_sklearn(model).save(str(tmp_path))
+    forest = BosqueCompacto.load(str(tmp_path))
+    assert isinstance(forest.value, np.memmap)
+    np.testing.assert_allclose(forest.predict(sample), model.predict(sample), rtol=0, atol=1e-9)
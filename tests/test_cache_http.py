@@ -0,0 +1,85 @@
+import time
+import pytest
+import requests
+from agentes.cache_http import CacheHttp
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheHttp(str(tmp_path / "http_cache.sqlite"))
+
+
+def fetch(cache, url, fresh_for=0):
+    return cache.get(url, fresh_for, lambda headers: requests.get(url, headers=headers, timeout=5))
+
+
+def serve_etag(servidor, body=b"<rss>v1</rss>", etag='"v1"'):
+    def respond(request):
+        if request.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag}, body
+    servidor.respond = respond
+
+
+def test_fresh_copy_makes_no_request(cache, servidor):
+    serve_etag(servidor)
+    assert fetch(cache, servidor.url + "/feed", fresh_for=300) == b"<rss>v1</rss>"
+    assert fetch(cache, servidor.url + "/feed", fresh_for=300) == b"<rss>v1</rss>"
+    assert len(servidor.requests) == 1
+
+
+def test_stale_copy_is_revalidated_with_etag(cache, servidor):
+    serve_etag(servidor)
+    fetch(cache, servidor.url + "/feed")
+    assert fetch(cache, servidor.url + "/feed") == b"<rss>v1</rss>"
+    assert servidor.requests[1].headers["If-None-Match"] == '"v1"'
+    # El 304 renueva la validación, así que la copia vuelve a ser fresca
+    assert fetch(cache, servidor.url + "/feed", fresh_for=300) == b"<rss>v1</rss>"
+    assert len(servidor.requests) == 2
+
+
+def test_stale_copy_is_revalidated_with_last_modified(cache, servidor):
+    modified = "Wed, 01 Oct 2025 10:00:00 GMT"
+
+    def respond(request):
+        if request.headers.get("If-Modified-Since") == modified:
+            return 304, {}, b""
+        return 200, {"Last-Modified": modified}, b"page"
+    servidor.respond = respond
+    fetch(cache, servidor.url + "/page")
+    assert fetch(cache, servidor.url + "/page") == b"page"
+    assert servidor.requests[1].headers["If-Modified-Since"] == modified
+    assert "If-None-Match" not in servidor.requests[1].headers
+
+
+def test_changed_resource_replaces_the_copy(cache, servidor):
+    serve_etag(servidor)
+    fetch(cache, servidor.url + "/feed")
+    serve_etag(servidor, body=b"<rss>v2</rss>", etag='"v2"')
+    assert fetch(cache, servidor.url + "/feed") == b"<rss>v2</rss>"
+    assert fetch(cache, servidor.url + "/feed", fresh_for=300) == b"<rss>v2</rss>"
+
+
+def test_errors_are_not_cached(cache, servidor):
+    servidor.respond = lambda request: (500, {}, b"error")
+    with pytest.raises(requests.HTTPError):
+        fetch(cache, servidor.url + "/feed")
+    assert cache._lookup(servidor.url + "/feed") is None
+
+
+def test_evict_removes_expired_and_excess_entries(tmp_path):
+    cache = CacheHttp(str(tmp_path / "http_cache.sqlite"), max_age=3600, max_entries=3)
+    for i in range(5):
+        cache._store(f"https://example.com/{i}", b"body", None, None)
+    with cache.lock, cache.db:
+        cache.db.execute("UPDATE responses SET validated_at = ? WHERE url = ?", (time.time() - 7200, "https://example.com/4"))
+    assert cache.evict() == 2
+    remaining = {url for (url,) in cache.db.execute("SELECT url FROM responses")}
+    assert remaining == {"https://example.com/1", "https://example.com/2", "https://example.com/3"}
+
+
+def test_writes_trigger_periodic_eviction(tmp_path):
+    cache = CacheHttp(str(tmp_path / "http_cache.sqlite"), max_entries=10)
+    for i in range(CacheHttp.EVICT_EVERY):
+        cache._store(f"https://example.com/{i}", b"body", None, None)
+    assert cache.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 10
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from agentes.embeddings import BACKENDS, ServicioEmbeddings, load_model
+
+TEXTS = [
+    "Lenovo IdeaPad Slim 3 15.6\" laptop with AMD Ryzen 5 7520U, 8GB RAM and a 512GB SSD",
+    "Café-style espresso machine with a 15-bar pump, milk frother and 1.8L water tank",
+    "Sony WH-1000XM5 wireless noise-cancelling headphones with 30-hour battery",
+    "DeWalt 20V MAX cordless drill and impact driver combo kit with two batteries",
+    "LEGO Star Wars Millennium Falcon building set, 1,351 pieces",
+    "Bosch 500 Series dishwasher, stainless steel, 44 dBA",
+]
+
+
+def load_or_skip(backend):
+    if backend.startswith("onnx"):
+        pytest.importorskip("onnxruntime")
+    try:
+        return load_model(ServicioEmbeddings.MODEL, backend)
+    except Exception as e:
+        pytest.skip(f"El backend {backend} no está disponible: {e}")
+
+
+def normalized(model):
+    vectors = np.asarray(model.encode(TEXTS), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return normalized(load_or_skip("torch"))
+
+
+@pytest.mark.parametrize("backend", [backend for backend in BACKENDS if backend != "torch"])
+def test_backend_matches_torch(backend, reference):
+    vectors = normalized(load_or_skip(backend))
+    assert np.min(np.sum(vectors * reference, axis=1)) >= 0.99
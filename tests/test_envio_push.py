@@ -0,0 +1,73 @@
+import urllib.parse
+import pytest
+from agentes.envio_push import EnvioPushover, digest
+
+
+def sender(servidor, statuses=(), **kwargs):
+    """
+    Crea un EnvioPushover contra el servidor local, que responde con statuses en orden y después con 200
+    """
+    pending = list(statuses)
+    servidor.respond = lambda request: (pending.pop(0) if pending else 200, {}, b'{"status":1}')
+    kwargs = {"coalesce_window": 0.05, "backoff": 0.01, **kwargs}
+    return EnvioPushover("token", "user", url=servidor.url + "/1/messages.json", **kwargs)
+
+
+def message(request) -> str:
+    return urllib.parse.parse_qs(request.body.decode())["message"][0]
+
+
+def test_delivers_form_and_reuses_connection(servidor):
+    push = sender(servidor, coalesce_window=0)
+    push.send("primera")
+    assert push.flush(5)
+    push.send("segunda")
+    assert push.flush(5)
+    fields = urllib.parse.parse_qs(servidor.requests[0].body.decode())
+    assert fields["token"] == ["token"] and fields["user"] == ["user"]
+    assert [message(request) for request in servidor.requests] == ["primera", "segunda"]
+    assert servidor.requests[0].port == servidor.requests[1].port
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_transient_errors_are_retried(servidor, status):
+    push = sender(servidor, statuses=[status, status])
+    push.send("oferta")
+    assert push.flush(5)
+    assert len(servidor.requests) == 3
+    assert all(message(request) == "oferta" for request in servidor.requests)
+
+
+def test_client_errors_are_not_retried(servidor):
+    push = sender(servidor, statuses=[400])
+    push.send("oferta")
+    assert push.flush(5)
+    assert len(servidor.requests) == 1
+
+
+def test_gives_up_after_the_last_retry(servidor):
+    push = sender(servidor, statuses=[503] * 10, retries=2)
+    push.send("oferta")
+    assert push.flush(5)
+    assert len(servidor.requests) == 3
+
+
+def test_burst_is_coalesced_into_one_digest(servidor):
+    push = sender(servidor, coalesce_window=0.5)
+    for text in ["uno", "dos", "tres"]:
+        push.send(text)
+    assert push.flush(5)
+    assert [message(request) for request in servidor.requests] == ["uno\n\ndos\n\ntres"]
+
+
+def test_flush_times_out_while_messages_are_pending(servidor):
+    push = sender(servidor, coalesce_window=1.0)
+    push.send("oferta")
+    assert not push.flush(0.05)
+    assert push.flush(5)
+
+
+def test_digest_splits_at_max_length():
+    assert digest(["a" * 6, "b" * 6, "c" * 2], 10) == ["a" * 6, "b" * 6 + "\n\n" + "c" * 2]
+    assert digest(["x" * 20], 10) == ["x" * 10]
+    assert digest([], 10) == []
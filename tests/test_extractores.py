@@ -0,0 +1,48 @@
+import glob
+import os
+import pytest
+from agentes import deals
+from agentes.extractores import ExtractorBeautifulSoup, ExtractorLxml, lxml
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures_html")
+SUMMARIES = sorted(glob.glob(os.path.join(FIXTURES, "resumen_*.html")))
+PAGES = sorted(glob.glob(os.path.join(FIXTURES, "pagina_*.html")))
+
+pytestmark = pytest.mark.skipif(lxml is None, reason="lxml no está instalado")
+
+
+@pytest.mark.parametrize("path", SUMMARIES, ids=os.path.basename)
+def test_summary_matches_reference(path):
+    with open(path, encoding="utf-8") as file:
+        snippet = file.read()
+    assert ExtractorLxml().summary(snippet) == ExtractorBeautifulSoup().summary(snippet)
+
+
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_content_matches_reference(path):
+    with open(path, "rb") as file:
+        page = file.read()
+    assert ExtractorLxml().content(page) == ExtractorBeautifulSoup().content(page)
+
+
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_details_match_reference(path, monkeypatch):
+    with open(path, "rb") as file:
+        page = file.read()
+    entry = {"title": "Oferta", "summary": "", "links": [{"href": "https://www.dealnews.com/oferta"}]}
+    scraped = {}
+    for extractor in (ExtractorBeautifulSoup(), ExtractorLxml()):
+        monkeypatch.setattr(deals, "extractor", extractor)
+        scraped[extractor.name] = deals.ScrapedDeal(entry, stuff=page)
+    assert scraped["lxml"].details == scraped["bs4"].details
+    assert scraped["lxml"].features == scraped["bs4"].features
+
+
+def test_content_collapses_indentation_like_reference():
+    page = b'<div class="content-section">\n  <p>Deal text</p>\n  <a>more</a>\n  <pre>\n  </pre>\n</div>'
+    assert ExtractorLxml().content(page) == "\nDeal text\nmore\n\n  \n"
+
+
+def test_content_decodes_utf8_without_meta_charset():
+    page = '<html><body><div class="content-section">Café – deal</div></body></html>'.encode()
+    assert ExtractorLxml().content(page) == "Café – deal"
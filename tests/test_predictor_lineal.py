@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+linear_model = pytest.importorskip("sklearn.linear_model")
+
+from agentes.predictor_lineal import COLUMNS, PredictorLineal, features
+
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(0)
+    estimates = rng.uniform(1, 1000, size=(200, 3))
+    X = features(estimates[:, 0], estimates[:, 1], estimates[:, 2])
+    y = X @ np.array([0.4, 0.3, 0.2, 0.05, 0.05]) + rng.normal(0, 10, size=len(X))
+    # Columnas desordenadas a propósito: from_model debe reordenar los coeficientes según COLUMNS
+    shuffled = ['Max', 'RandomForest', 'Specialist', 'Min', 'Frontier']
+    return linear_model.LinearRegression().fit(pd.DataFrame(X, columns=COLUMNS)[shuffled], y)
+
+
+def expected(model, X):
+    return model.predict(pd.DataFrame(X, columns=COLUMNS)[list(model.feature_names_in_)])
+
+
+def test_single_row_matches_sklearn(model):
+    predictor = PredictorLineal.from_model(model)
+    X = features([350.0], [420.0], [390.0])
+    assert predictor.predict(X) == pytest.approx(expected(model, X), rel=1e-9)
+
+
+def test_batch_matches_sklearn(model):
+    predictor = PredictorLineal.from_model(model)
+    estimates = np.random.default_rng(1).uniform(1, 2000, size=(1000, 3))
+    X = features(estimates[:, 0], estimates[:, 1], estimates[:, 2])
+    np.testing.assert_allclose(predictor.predict(X), expected(model, X), rtol=1e-9)
+
+
+def test_non_linear_model_is_rejected():
+    assert PredictorLineal.from_model(object()) is None